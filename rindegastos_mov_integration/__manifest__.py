@@ -7,8 +7,14 @@
     'data': [
         'security/ir.model.access.csv',
         'views/rindegastos_mov_wizard_views.xml',
+        'views/rindegastos_match_wizard_views.xml',
         'views/rindegastos_report_views.xml',
         'views/rindegastos_expense_views.xml',
+        'views/rindegastos_sync_job_views.xml',
+        'views/rindegastos_sync_run_views.xml',
+        'views/rindegastos_api_page_views.xml',
+        'views/rindegastos_event_views.xml',
+        'views/rindegastos_archive_views.xml',
         'views/account_journal_views.xml',
         'views/res_config_settings_views.xml',
         'views/bank_statement_line_views.xml',  # Debe estar aquí
@@ -0,0 +1,25 @@
+from odoo import http
+from odoo.http import request
+import hmac
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosWebhook(http.Controller):
+
+    @http.route('/rindegastos/webhook', type='http', auth='public', methods=['POST'], csrf=False, save_session=False)
+    def receive_events(self, **kwargs):
+        """Encola las notificaciones autenticadas con el encabezado X-Rindegastos-Secret."""
+        secret = request.env['ir.config_parameter'].sudo().get_param('rindegastos.webhook_secret')
+        provided = request.httprequest.headers.get('X-Rindegastos-Secret', '')
+        if not secret or not hmac.compare_digest(secret.encode(), provided.encode()):
+            return request.make_json_response({'error': 'Secreto inválido'}, status=403)
+        try:
+            body = json.loads(request.httprequest.get_data() or b'{}')
+            events = body.get('Events', [body]) if isinstance(body, dict) else body
+            queued = request.env['rindegastos.event'].sudo()._enqueue_events(events)
+        except ValueError as e:
+            return request.make_json_response({'error': str(e)}, status=400)
+        return request.make_json_response({'queued': queued}, status=202)
@@ -1,7 +1,16 @@
+from . import rindegastos_statement_mixin
 from . import rindegastos_report
 from . import rindegastos_expense
+from . import rindegastos_api_page
+from . import rindegastos_archive
+from . import rindegastos_sync_job
+from . import rindegastos_sync_run
+from . import rindegastos_event
+from . import rindegastos_thumbnail
 from . import account_journal
 from . import rindegastos_mov_wizard
+from . import rindegastos_match_wizard
 from . import res_company
 from . import res_config_settings
+from . import res_partner
 from . import account_bank_statement_line
\ No newline at end of file
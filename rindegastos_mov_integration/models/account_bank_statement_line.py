@@ -1,22 +1,90 @@
 from odoo import models, fields, api
 from odoo.exceptions import UserError
+from odoo.tools import float_round
+import math
+import re
+
+PAYABLE_MOVE_TYPES = ('in_invoice', 'in_receipt')
 
 class AccountBankStatementLine(models.Model):
     _inherit = 'account.bank.statement.line'
 
     rindegastos_file_url = fields.Char(string='Rindegastos File URL', readonly=True)
     rindegastos_file_preview = fields.Html(string='Rindegastos File Preview', compute='_compute_rindegastos_preview', readonly=True)
+    rindegastos_document_number = fields.Char(string='Rindegastos Document Number', readonly=True, index='btree_not_null')
 
     @api.depends('rindegastos_file_url')
     def _compute_rindegastos_preview(self):
+        previews = self.env['rindegastos.thumbnail']._render_previews(self.mapped('rindegastos_file_url'))
         for record in self:
-            if record.rindegastos_file_url:
-                record.rindegastos_file_preview = f'<a href="{record.rindegastos_file_url}" target="_blank"><img src="{record.file_url}" style="max-width: 300px; max-height: 300px;" alt="Vista previa del archivo"/></a>'
-            else:
-                record.rindegastos_file_preview = ''
+            record.rindegastos_file_preview = previews.get(record.rindegastos_file_url) or ''
 
     def action_import_rindegastos(self):
         self.ensure_one()
         if self.journal_id.bank_statements_source != 'rindegastos':
             raise UserError("Esta línea no está asociada a sincronización con Rindegastos.")
-        return self.journal_id.action_open_rindegastos_mov_wizard()  # El context se maneja en el journal
\ No newline at end of file
+        return self.journal_id.action_open_rindegastos_mov_wizard()  # El context se maneja en el journal
+
+    @api.model
+    def _normalize_document_number(self, number):
+        """Número de documento comparable: solo letras y dígitos, sin ceros a la izquierda."""
+        return re.sub(r'[^0-9A-Z]', '', (number or '').upper()).lstrip('0')
+
+    def _rindegastos_match_bills(self, tolerance=0.0):
+        """Propone una factura de proveedor abierta por línea, por número de documento o por (contacto, monto)."""
+        lines = self.filtered(lambda l: not l.is_reconciled and l.amount < 0)
+        if not lines:
+            return []
+        bills = self.env['account.move'].search_read([
+            ('move_type', 'in', PAYABLE_MOVE_TYPES),
+            ('state', '=', 'posted'),
+            ('payment_state', 'in', ('not_paid', 'partial')),
+            ('company_id', 'in', lines.company_id.ids),
+            '|',
+            ('commercial_partner_id', 'in', lines.partner_id.commercial_partner_id.ids),
+            ('ref', '!=', False),
+        ], ['commercial_partner_id', 'ref', 'amount_residual'], order='invoice_date_due, id')
+
+        def bucket(amount):
+            return math.floor(amount / tolerance) if tolerance else float_round(amount, 2)
+
+        by_document, by_amount = {}, {}
+        for bill in bills:
+            partner_id = bill['commercial_partner_id'] and bill['commercial_partner_id'][0]
+            document = self._normalize_document_number(bill['ref'])
+            if document:
+                by_document.setdefault(document, []).append(bill)
+            if partner_id:
+                by_amount.setdefault((partner_id, bucket(bill['amount_residual'])), []).append(bill)
+
+        used, matches = set(), []
+        for line in lines:
+            amount = -line.amount
+            partner_id = line.partner_id.commercial_partner_id.id
+            document = self._normalize_document_number(line.rindegastos_document_number)
+            match, rule = None, None
+            for bill in by_document.get(document, []) if document else []:
+                same_partner = not partner_id or bill['commercial_partner_id'] and bill['commercial_partner_id'][0] == partner_id
+                if bill['id'] not in used and same_partner and abs(bill['amount_residual'] - amount) <= tolerance + 0.005:
+                    match, rule = bill, 'document'
+                    break
+            if not match and partner_id:
+                keys = [bucket(amount) + offset for offset in (0, -1, 1)] if tolerance else [bucket(amount)]
+                candidates = [
+                    bill for key in keys for bill in by_amount.get((partner_id, key), [])
+                    if bill['id'] not in used and abs(bill['amount_residual'] - amount) <= tolerance + 0.005
+                ]
+                if candidates:
+                    match, rule = min(candidates, key=lambda bill: abs(bill['amount_residual'] - amount)), 'amount'
+            if match:
+                used.add(match['id'])
+                matches.append((line, self.env['account.move'].browse(match['id']), rule, match['amount_residual'] - amount))
+        return matches
+
+    def _rindegastos_reconcile_bill(self, bill):
+        """Concilia la línea con las cuentas por pagar abiertas de la factura mediante el widget de conciliación."""
+        self.ensure_one()
+        payable_lines = bill.line_ids.filtered(lambda l: l.account_type == 'liability_payable' and not l.reconciled)
+        wizard = self.env['bank.rec.widget'].with_context(default_st_line_id=self.id).new({})
+        wizard._action_add_new_amls(payable_lines)
+        wizard._action_validate()
@@ -1,4 +1,5 @@
 from odoo import models, fields
+from datetime import timedelta
 
 class AccountJournal(models.Model):
     _inherit = 'account.journal'
@@ -10,6 +11,23 @@ class AccountJournal(models.Model):
 
     bank_statements_source = fields.Selection(selection=_get_bank_statements_available_sources)
     employee_id = fields.Many2one('hr.employee', string='Empleado Rindegastos', help='Empleado asociado para filtrar en Rindegastos API', domain=[('rindegastos_userid', '!=', False)])
+    rindegastos_last_sync = fields.Date(string='Última Sincronización Rindegastos', readonly=True, copy=False, help='Fecha hasta la que se importó Rindegastos con éxito; se actualiza automáticamente')
+
+    def _get_rindegastos_sync_since(self):
+        """Marca de agua menos el solapamiento; sin marca de agua, la fecha de carga inicial."""
+        self.ensure_one()
+        params = self.env['ir.config_parameter'].sudo()
+        if not self.rindegastos_last_sync:
+            backfill_days = int(params.get_param('rindegastos.sync_backfill_days', 365))
+            return fields.Date.context_today(self) - timedelta(days=backfill_days) if backfill_days > 0 else None
+        overlap_days = int(params.get_param('rindegastos.sync_overlap_days', 3))
+        return self.rindegastos_last_sync - timedelta(days=overlap_days)
+
+    def _advance_rindegastos_watermark(self, until):
+        """Avanza la marca de agua; se escribe en la misma transacción que el lote importado."""
+        to_advance = self.filtered(lambda j: not j.rindegastos_last_sync or j.rindegastos_last_sync < until)
+        if to_advance:
+            to_advance.write({'rindegastos_last_sync': until})
 
     def action_open_rindegastos_mov_wizard(self):
         self.ensure_one()
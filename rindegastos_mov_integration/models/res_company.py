@@ -3,4 +3,5 @@ from odoo import models, fields
 class ResCompany(models.Model):
     _inherit = 'res.company'
 
-    rindegastos_tokenid = fields.Char(string='Rindegastos Token ID', help='Token de acceso para la API de Rindegastos')
\ No newline at end of file
+    rindegastos_tokenid = fields.Char(string='Rindegastos Token ID', help='Token de acceso para la API de Rindegastos')
+    rindegastos_retention_months = fields.Integer(string='Retención de Rindegastos (meses)', help='Reports y expenses conciliados más antiguos que estos meses se compactan en el archivo; 0 los conserva siempre')
\ No newline at end of file
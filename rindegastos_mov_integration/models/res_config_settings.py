@@ -3,4 +3,16 @@ from odoo import models, fields
 class ResConfigSettings(models.TransientModel):
     _inherit = 'res.config.settings'
 
-    rindegastos_tokenid = fields.Char(string='Rindegastos Token ID', related='company_id.rindegastos_tokenid', readonly=False)
\ No newline at end of file
+    rindegastos_tokenid = fields.Char(string='Rindegastos Token ID', related='company_id.rindegastos_tokenid', readonly=False)
+    rindegastos_retention_months = fields.Integer(related='company_id.rindegastos_retention_months', readonly=False)
+    rindegastos_requests_per_second = fields.Float(string='Solicitudes por Segundo', config_parameter='rindegastos.requests_per_second', default=5.0, help='Máximo de solicitudes por segundo a la API de Rindegastos por token')
+    rindegastos_max_retries = fields.Integer(string='Reintentos Máximos', config_parameter='rindegastos.max_retries', default=5, help='Reintentos ante respuestas 429/5xx o errores de conexión')
+    rindegastos_fetch_workers = fields.Integer(string='Descargas Paralelas', config_parameter='rindegastos.fetch_workers', default=4, help='Cantidad máxima de diarios y páginas que se descargan en paralelo por token')
+    rindegastos_sync_overlap_days = fields.Integer(string='Días de Solapamiento', config_parameter='rindegastos.sync_overlap_days', default=3, help='Días que se vuelven a consultar antes de la última sincronización de cada diario')
+    rindegastos_sync_backfill_days = fields.Integer(string='Días de Carga Inicial', config_parameter='rindegastos.sync_backfill_days', default=365, help='Días de historia que se importan para un diario sin sincronizaciones previas; 0 importa toda la historia en una sola ventana')
+    rindegastos_sync_window_records = fields.Integer(string='Registros por Ventana', config_parameter='rindegastos.sync_window_records', default=2000, help='Las ventanas de fechas con más registros se dividen para descargarlas en paralelo')
+    rindegastos_staging_retention_days = fields.Integer(string='Retención de Staging (días)', config_parameter='rindegastos.staging_retention_days', default=30, help='Días que se conservan las páginas crudas ya procesadas de la API')
+    rindegastos_match_tolerance = fields.Float(string='Tolerancia de Conciliación', config_parameter='rindegastos.match_tolerance', default=0.0, help='Diferencia de monto aceptada al proponer facturas de proveedor para las líneas de Rindegastos')
+    rindegastos_webhook_secret = fields.Char(string='Secreto del Webhook', config_parameter='rindegastos.webhook_secret', help='Secreto compartido que Rindegastos envía en el encabezado X-Rindegastos-Secret a /rindegastos/webhook')
+    rindegastos_thumbnail_max_age_days = fields.Integer(string='Antigüedad de Miniaturas (días)', config_parameter='rindegastos.thumbnail_max_age_days', default=90, help='Días que se conservan las miniaturas locales de los archivos de Rindegastos')
+    rindegastos_thumbnail_max_mb = fields.Integer(string='Tamaño Máximo de Miniaturas (MB)', config_parameter='rindegastos.thumbnail_max_mb', default=200, help='Al superarlo se eliminan primero las miniaturas más antiguas')
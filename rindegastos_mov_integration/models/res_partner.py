@@ -0,0 +1,46 @@
+from odoo import models, fields, api
+from odoo.tools.sql import column_exists, create_column
+import re
+
+# Expresión SQL equivalente a _normalize_rindegastos_rut; {} es la columna o el parámetro a normalizar
+RUT_NORMALIZE_SQL = r"NULLIF(LTRIM(REGEXP_REPLACE(REGEXP_REPLACE(UPPER({}), '^\s*CL', ''), '[^0-9K]', '', 'g'), '0'), '')"
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    rindegastos_vat_normalized = fields.Char(string='RUT Normalizado', compute='_compute_rindegastos_vat_normalized', store=True, index=True, help='RUT sin puntos, guion, prefijo CL ni ceros a la izquierda, usado para enlazar gastos de Rindegastos')
+
+    def _auto_init(self):
+        # Calcula la columna en SQL al instalar para no recomputar en Python toda la tabla de contactos
+        if not column_exists(self._cr, 'res_partner', 'rindegastos_vat_normalized'):
+            create_column(self._cr, 'res_partner', 'rindegastos_vat_normalized', 'varchar')
+            self._cr.execute(f"""
+                UPDATE res_partner
+                   SET rindegastos_vat_normalized = {RUT_NORMALIZE_SQL.format('vat')}
+                 WHERE vat IS NOT NULL
+            """)
+        return super()._auto_init()
+
+    @api.model
+    def _normalize_rindegastos_rut(self, rut):
+        """'12.345.678-9', 'CL123456789' y '123456789' se normalizan igual; debe coincidir con RUT_NORMALIZE_SQL."""
+        value = re.sub(r'^\s*CL', '', (rut or '').upper())
+        return re.sub(r'[^0-9K]', '', value).lstrip('0') or False
+
+    @api.depends('vat')
+    def _compute_rindegastos_vat_normalized(self):
+        for partner in self:
+            partner.rindegastos_vat_normalized = self._normalize_rindegastos_rut(partner.vat)
+
+    @api.model
+    def _get_partners_by_rut(self, ruts):
+        """Devuelve {RUT normalizado: id de contacto} con una sola consulta, prefiriendo contactos sin padre."""
+        normalized = {self._normalize_rindegastos_rut(rut) for rut in ruts} - {False}
+        if not normalized:
+            return {}
+        partners = self.search_read([('rindegastos_vat_normalized', 'in', list(normalized))], ['rindegastos_vat_normalized', 'parent_id'], order='id')
+        partner_map = {}
+        for partner in sorted(partners, key=lambda p: bool(p['parent_id'])):
+            partner_map.setdefault(partner['rindegastos_vat_normalized'], partner['id'])
+        return partner_map
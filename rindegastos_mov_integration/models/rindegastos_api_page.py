@@ -0,0 +1,164 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from datetime import timedelta
+import base64
+import hashlib
+import json
+import logging
+import zlib
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosApiPage(models.Model):
+    _name = 'rindegastos.api.page'
+    _description = 'Página cruda descargada de la API de Rindegastos'
+    _order = 'journal_id, endpoint, scope, page'
+
+    journal_id = fields.Many2one('account.journal', string='Diario Contable', required=True, ondelete='cascade')
+    endpoint = fields.Char(string='Endpoint', required=True)
+    scope = fields.Char(string='Alcance', default='', help='ReportId consultado o ventana de fechas Since..Until')
+    page = fields.Integer(string='Página', required=True)
+    payload = fields.Binary(string='Payload Comprimido', attachment=False)
+    payload_size = fields.Integer(string='Tamaño (bytes)', help='Tamaño del JSON sin comprimir')
+    content_hash = fields.Char(string='Hash del Contenido', index=True)
+    state = fields.Selection([
+        ('staged', 'Pendiente'),
+        ('processed', 'Procesada'),
+        ('failed', 'Fallida'),
+    ], string='Estado', default='staged', required=True, index=True)
+    job_id = fields.Many2one('rindegastos.sync.job', string='Job', ondelete='set null', index='btree_not_null', help='Job que descargó la página y debe transformarla')
+    last_error = fields.Text(string='Error', readonly=True, help='Error de la última transformación fallida')
+
+    _sql_constraints = [
+        ('page_uniq', 'unique(journal_id, endpoint, scope, page)', 'La página ya está en el área de staging.'),
+    ]
+
+    @api.model
+    def _encode_payload(self, data):
+        """Devuelve (payload comprimido en base64, hash sha256, tamaño) del JSON canónico de la página."""
+        raw = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+        return base64.b64encode(zlib.compress(raw)), hashlib.sha256(raw).hexdigest(), len(raw)
+
+    def _decode_payload(self):
+        self.ensure_one()
+        return json.loads(zlib.decompress(base64.b64decode(self.payload)))
+
+    @api.model
+    def _get_scope(self, params):
+        """Alcance de las páginas: el ReportId consultado o la ventana de fechas Since..Until."""
+        if params.get('ReportId'):
+            return str(params['ReportId'])
+        if params.get('Since') or params.get('Until'):
+            return f"{params.get('Since') or ''}..{params.get('Until') or ''}"
+        return ''
+
+    @api.model
+    def _stage_pages(self, journal, endpoint, params, payloads, start=1, job=None, force=False):
+        """Guarda las páginas descargadas y devuelve [(registro, data)] de las nuevas o cambiadas."""
+        scope = self._get_scope(params)
+        pages = range(start, start + len(payloads))
+        existing = {
+            row.page: row
+            for row in self.search([
+                ('journal_id', '=', journal.id),
+                ('endpoint', '=', endpoint),
+                ('scope', '=', scope),
+                ('page', 'in', list(pages)),
+            ])
+        }
+        to_transform = []
+        vals_list, new_data = [], []
+        for page, data in zip(pages, payloads):
+            payload, content_hash, size = self._encode_payload(data)
+            row = existing.get(page)
+            if not force and row and row.content_hash == content_hash and row.state in ('processed', 'failed'):
+                continue
+            vals = {
+                'payload': payload,
+                'content_hash': content_hash,
+                'payload_size': size,
+                'state': 'staged',
+                'job_id': job.id if job else False,
+                'last_error': False,
+            }
+            if row:
+                row.write(vals)
+                to_transform.append((row, data))
+            else:
+                vals_list.append(dict(vals, journal_id=journal.id, endpoint=endpoint, scope=scope, page=page))
+                new_data.append(data)
+        to_transform += list(zip(self.create(vals_list), new_data))
+        return to_transform
+
+    def _load_payloads(self):
+        """Lectura masiva de las páginas en staging: [(registro, data)] en orden."""
+        return [(row, row._decode_payload()) for row in self]
+
+    def _mark_processed(self):
+        if self:
+            self.write({'state': 'processed', 'last_error': False})
+
+    def _mark_failed(self, error):
+        """Aparta la página que no se pudo transformar para que no bloquee las siguientes."""
+        self.ensure_one()
+        _logger.warning(f"No se pudo transformar la página {self.page} de {self.endpoint} ({self.scope}) del diario {self.journal_id.name}: {error}")
+        self.write({'state': 'failed', 'last_error': str(error)})
+
+    def _transform(self):
+        """Transforma las páginas (reports antes que expenses), cada una en su propio savepoint; devuelve (reports, expenses, fallidas)."""
+        new_reports, new_expenses = self.env['rindegastos.report'].browse(), self.env['rindegastos.expense'].browse()
+        failed = self.browse()
+        rows = self.filtered(lambda r: r.endpoint == 'getExpenseReports') + self.filtered(lambda r: r.endpoint == 'getExpenses')
+        for row, data in rows._load_payloads():
+            journal = row.journal_id.with_company(row.journal_id.company_id)
+            try:
+                with self.env.cr.savepoint():
+                    if row.endpoint == 'getExpenseReports':
+                        new_reports |= self._transform_report_page(journal, data)
+                    else:
+                        new_expenses |= self._transform_expense_page(journal, data)
+            except (UserError, ValueError, KeyError, TypeError) as e:
+                row._mark_failed(e)
+                failed |= row
+        new_reports.create_account_move()
+        new_expenses.create_account_move()
+        (self - failed)._mark_processed()
+        return new_reports, new_expenses, failed
+
+    @api.model
+    def _transform_report_page(self, journal, data):
+        report_model = self.env['rindegastos.report'].with_company(journal.company_id)
+        reports = data.get('ExpenseReports', [])
+        if not reports:
+            return report_model
+        return report_model._create_reports_from_page(journal, reports)
+
+    @api.model
+    def _transform_expense_page(self, journal, data):
+        expense_model = self.env['rindegastos.expense'].with_company(journal.company_id)
+        transactions = data.get('Expenses', [])
+        if not transactions:
+            return expense_model
+        # Solo se enlazan expenses de reports ya importados en este diario
+        report_names = {str(tx['ReportId']) for tx in transactions if tx.get('ReportId')}
+        report_map = {
+            report.name: report
+            for report in self.env['rindegastos.report'].search([('journal_id', '=', journal.id), ('name', 'in', list(report_names))])
+        }
+        return expense_model._create_expenses_from_page(journal, transactions, report_map=report_map)
+
+    def action_replay(self):
+        """Vuelve a transformar las páginas seleccionadas sin consultar la API, igual que el job que las descargó."""
+        self._transform()
+
+    @api.autovacuum
+    def _gc_processed_pages(self):
+        """Elimina las páginas procesadas, fallidas o sin job pendiente más antiguas que la retención."""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param('rindegastos.staging_retention_days', 30))
+        limit_date = fields.Datetime.now() - timedelta(days=retention_days)
+        self.search([
+            ('write_date', '<', limit_date),
+            '|', ('state', 'in', ('processed', 'failed')),
+            '&', ('state', '=', 'staged'), '|', ('job_id', '=', False), ('job_id.state', '!=', 'pending'),
+        ]).unlink()
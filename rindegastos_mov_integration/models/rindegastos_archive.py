@@ -0,0 +1,94 @@
+from odoo import models, fields, api
+from dateutil.relativedelta import relativedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Los expenses se compactan antes que sus reports: un report solo sale cuando ya no tiene expenses activos
+ARCHIVED_MODELS = ('rindegastos.expense', 'rindegastos.report')
+
+
+class RindegastosArchive(models.Model):
+    _name = 'rindegastos.archive'
+    _description = 'Registro compactado de Rindegastos (solo Id externo y hash)'
+    _order = 'id desc'
+
+    res_model = fields.Selection([
+        ('rindegastos.expense', 'Expense'),
+        ('rindegastos.report', 'Report'),
+    ], string='Modelo', required=True)
+    journal_id = fields.Many2one('account.journal', string='Diario Contable', required=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', related='journal_id.company_id', store=True)
+    name = fields.Char(string='Id Rindegastos', required=True)
+    content_hash = fields.Char(string='Hash del Contenido')
+    date = fields.Date(string='Fecha')
+
+    _sql_constraints = [
+        ('record_uniq', 'unique(journal_id, res_model, name)', 'El registro ya está en el archivo.'),
+    ]
+
+    @api.model
+    def _get_archived_names(self, res_model, journal, names):
+        """Ids externos de ``names`` ya compactados para el diario, en una sola consulta indexada."""
+        if not names:
+            return set()
+        self.env.cr.execute(f"""
+            SELECT name FROM {self._table}
+             WHERE journal_id = %s AND res_model = %s AND name = ANY(%s)
+        """, [journal.id, res_model, list(names)])
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @api.model
+    def cron_compact_history(self):
+        """Compacta por trozos los registros conciliados más antiguos que la retención de cada compañía."""
+        params = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(params.get_param('rindegastos.compact_chunk_size', 1000))
+        deadline = time.monotonic() + int(params.get_param('rindegastos.sync_time_budget', 600))
+        today = fields.Date.context_today(self)
+        for company in self.env['res.company'].sudo().search([('rindegastos_retention_months', '>', 0)]):
+            limit_date = today - relativedelta(months=company.rindegastos_retention_months)
+            for res_model in ARCHIVED_MODELS:
+                model = self.env[res_model].with_company(company).sudo()
+                while True:
+                    if time.monotonic() >= deadline:
+                        self.env.ref('rindegastos_mov_integration.cron_compact_rindegastos_history')._trigger()
+                        return
+                    records = model.search(self._get_compactable_domain(res_model, company, limit_date), limit=chunk_size)
+                    if not records:
+                        break
+                    self._compact(records)
+                    self.env.cr.commit()
+
+    @api.model
+    def _get_compactable_domain(self, res_model, company, limit_date):
+        domain = [
+            ('journal_id.company_id', '=', company.id),
+            ('date', '<', limit_date),
+            ('move_id', '!=', False),
+            ('move_id.statement_line_id.is_reconciled', '=', True),
+        ]
+        if res_model == 'rindegastos.report':
+            domain.append(('expense_ids', '=', False))
+        return domain
+
+    @api.model
+    def _compact(self, records):
+        """Guarda (diario, Id, hash) de los registros en el archivo y los elimina de la tabla activa."""
+        vals_list = []
+        for journal, journal_records in records.grouped('journal_id').items():
+            archived = self._get_archived_names(records._name, journal, set(journal_records.mapped('name')))
+            for record in journal_records:
+                if record.name in archived:
+                    continue
+                archived.add(record.name)
+                vals_list.append({
+                    'res_model': records._name,
+                    'journal_id': journal.id,
+                    'name': record.name,
+                    'content_hash': record.content_hash,
+                    'date': record.date,
+                })
+        self.create(vals_list)
+        _logger.info(f"Compactados {len(records)} registros de {records._name}")
+        records.unlink()
@@ -0,0 +1,149 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.addons.rindegastos_userid.tools.common import RindegastosApiError, run_concurrently, total_workers
+from odoo.addons.rindegastos_userid.tools.sync_stats import journal_scope, sync_phase
+from datetime import timedelta
+import json
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosEvent(models.Model):
+    _name = 'rindegastos.event'
+    _description = 'Notificación de cambio recibida desde Rindegastos'
+    _order = 'id'
+
+    event_type = fields.Char(string='Evento')
+    user_api_id = fields.Char(string='UserId', required=True, index=True)
+    report_api_id = fields.Char(string='ReportId', required=True)
+    payload = fields.Text(string='Contenido')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Procesado'),
+        ('failed', 'Fallido'),
+    ], string='Estado', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Intentos')
+    last_error = fields.Text(string='Último Error', readonly=True)
+
+    @api.model
+    def _enqueue_events(self, events):
+        """Guarda las notificaciones válidas, fusiona las repetidas y devuelve cuántas se encolaron."""
+        if not isinstance(events, list):
+            raise ValueError("Se esperaba una lista de eventos")
+        keys = {}
+        for event in events:
+            if not isinstance(event, dict) or not event.get('UserId') or not event.get('ReportId'):
+                raise ValueError("Cada evento debe incluir UserId y ReportId")
+            keys.setdefault((str(event['UserId']), str(event['ReportId'])), event)
+        pending = {
+            (event.user_api_id, event.report_api_id)
+            for event in self.search([('state', '=', 'pending'), ('report_api_id', 'in', [key[1] for key in keys])])
+        }
+        new_events = self.create([{
+            'event_type': event.get('Event') or event.get('Type') or '',
+            'user_api_id': user_api_id,
+            'report_api_id': report_api_id,
+            'payload': json.dumps(event),
+        } for (user_api_id, report_api_id), event in keys.items() if (user_api_id, report_api_id) not in pending])
+        if new_events:
+            self.env.ref('rindegastos_mov_integration.cron_process_rindegastos_events')._trigger()
+        return len(new_events)
+
+    @api.model
+    def cron_process_events(self):
+        """Vacía la cola por lotes, confirmando cada uno, dentro del presupuesto de tiempo de la sincronización."""
+        if not self.search_count([('state', '=', 'pending')], limit=1):
+            return
+        params = self.env['ir.config_parameter'].sudo()
+        batch_size = int(params.get_param('rindegastos.event_batch_size', 100))
+        max_attempts = int(params.get_param('rindegastos.sync_max_attempts', 5))
+        deadline = time.monotonic() + int(params.get_param('rindegastos.sync_time_budget', 600))
+        processed_ids = []  # Los eventos que fallan se reintentan en la próxima ejecución, no en esta
+        with self.env['rindegastos.sync.run']._track('webhook'):
+            while time.monotonic() < deadline:
+                events = self.search([('state', '=', 'pending'), ('id', 'not in', processed_ids)], limit=batch_size)
+                if not events:
+                    return
+                processed_ids += events.ids
+                events._process_batch(max_attempts)
+                self.env.cr.commit()
+        self.env.ref('rindegastos_mov_integration.cron_process_rindegastos_events')._trigger()
+
+    def _process_batch(self, max_attempts):
+        """Importa cada report afectado y sus expenses con la misma lógica de la sincronización."""
+        journals = self.env['account.journal'].sudo().search(
+            self.env['rindegastos.report']._get_rindegastos_journal_domain()
+            + [('employee_id.rindegastos_userid', 'in', list(set(self.mapped('user_api_id'))))]
+        )
+        journal_by_user = {journal.employee_id.rindegastos_userid: journal for journal in journals}
+        targets = {}  # (diario, ReportId) -> eventos
+        for event in self:
+            journal = journal_by_user.get(event.user_api_id)
+            if not journal:
+                event._record_failure(UserError(f"No hay un diario de Rindegastos para el UserId {event.user_api_id}."), max_attempts)
+                continue
+            targets.setdefault((journal, event.report_api_id), self.browse())
+            targets[(journal, event.report_api_id)] |= event
+
+        expense_model = self.env['rindegastos.expense']
+        specs = [
+            (journal.company_id._get_rindegastos_client(), journal.id, report_api_id,
+             expense_model.with_company(journal.company_id)._prepare_expense_params(journal, report_api_id=report_api_id))
+            for journal, report_api_id in targets
+        ]
+        results = run_concurrently(lambda spec: self._fetch_report(*spec), specs, total_workers(spec[0] for spec in specs))
+        for ((journal, report_api_id), events), result in zip(targets.items(), results):
+            try:
+                with self.env.cr.savepoint():
+                    if isinstance(result, Exception):
+                        raise result
+                    events.with_company(journal.company_id)._import_report(journal.with_company(journal.company_id), report_api_id, *result)
+                    events.write({'state': 'done', 'last_error': False})
+            except (RindegastosApiError, UserError, ValueError, KeyError) as e:
+                events._record_failure(e, max_attempts)
+
+    @api.model
+    def _fetch_report(self, client, journal_id, report_api_id, expense_params):
+        """Descarga el report y todas sus páginas de expenses."""
+        try:
+            with journal_scope(journal_id), sync_phase('fetch'):
+                report = client.get('getExpenseReport', {'Id': report_api_id})
+                return report, client.get_all_pages('getExpenses', expense_params)
+        except RindegastosApiError as e:
+            return e
+
+    def _import_report(self, journal, report_api_id, report, expense_pages):
+        report_model = self.env['rindegastos.report']
+        expense_model = self.env['rindegastos.expense']
+        # Igual que la sincronización, solo se importan reports aprobados (Status 1)
+        if report and str(report.get('Status', 1)) == '1':
+            new_reports = report_model._create_reports_from_page(journal, [report])
+        else:
+            new_reports = report_model.browse()
+        report_record = report_model.search([('journal_id', '=', journal.id), ('name', '=', str(report_api_id))], limit=1)
+        new_expenses = expense_model.browse()
+        if report_record:
+            for data in expense_pages:
+                transactions = data.get('Expenses', [])
+                if transactions:
+                    new_expenses |= expense_model._create_expenses_from_page(journal, transactions, report_map={report_record.name: report_record})
+        new_reports.create_account_move()
+        new_expenses.create_account_move()
+
+    def _record_failure(self, error, max_attempts):
+        _logger.warning(f"Error al procesar notificaciones de Rindegastos {self.ids}: {error}")
+        for event in self:
+            attempts = event.attempts + 1
+            event.write({
+                'attempts': attempts,
+                'last_error': str(error),
+                'state': 'failed' if attempts >= max_attempts or isinstance(error, UserError) else 'pending',
+            })
+
+    @api.autovacuum
+    def _gc_processed_events(self):
+        """Elimina los eventos procesados o fallidos con más de 30 días."""
+        limit_date = fields.Datetime.now() - timedelta(days=30)
+        self.search([('state', 'in', ('done', 'failed')), ('write_date', '<', limit_date)]).unlink()
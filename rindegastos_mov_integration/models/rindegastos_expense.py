@@ -1,13 +1,17 @@
-from odoo import models, fields, api
-import requests
+from odoo import models, fields, api, tools
 from odoo.exceptions import UserError
+from odoo.addons.rindegastos_userid.tools.common import RindegastosApiError, run_concurrently, total_workers
+from odoo.addons.rindegastos_userid.tools.sync_stats import count_stat, journal_scope, sync_phase
 from datetime import datetime
 import logging
 
 _logger = logging.getLogger(__name__)
 
+PARTNER_DOCUMENT_TYPES = ['Factura Afecta', 'Factura Exenta', 'Honorarios']
+
 class RindegastosExpense(models.Model):
     _name = 'rindegastos.expense'
+    _inherit = ['rindegastos.statement.mixin']
     _description = 'Expenses desde Rindegastos API'
 
     name = fields.Char(string='Referencia', required=True)
@@ -18,11 +22,18 @@ class RindegastosExpense(models.Model):
     move_id = fields.Many2one('account.move', string='Asiento Contable', readonly=True)
     state = fields.Selection([('draft', 'Borrador'), ('posted', 'Contabilizado')], default='draft')
     partner_id = fields.Many2one('res.partner', string='Contacto', readonly=True)
+    document_number = fields.Char(string='Número de Documento', readonly=True, help='Campo extra "Numero de Documento" del gasto en Rindegastos')
     employee_name = fields.Char(string='Empleado', compute='_compute_employee_name', store=False, help='Nombre del empleado que rindió el gasto')
     report_id = fields.Many2one('rindegastos.report', string='Reporte Relacionado')  # Many2one para relación real
     file_url = fields.Char(string='Enlace al Archivo', help='Enlace al archivo del gasto en Rindegastos')
     file_preview = fields.Html(string='Vista Previa del Archivo', compute='_compute_file_preview', store=False, help='Vista previa de la imagen del archivo')
 
+    _rindegastos_link_fields = ('report_id', 'partner_id')
+
+    def init(self):
+        tools.drop_index(self._cr, 'rindegastos_expense_dedup_index', self._table)
+        tools.create_index(self._cr, 'rindegastos_expense_upsert_index', self._table, ['journal_id', 'name'])
+
     @api.depends('journal_id.employee_id')
     def _compute_employee_name(self):
         for record in self:
@@ -30,149 +41,160 @@ class RindegastosExpense(models.Model):
 
     @api.depends('file_url')
     def _compute_file_preview(self):
+        previews = self.env['rindegastos.thumbnail']._render_previews(self.mapped('file_url'))
         for record in self:
-            if record.file_url:
-                record.file_preview = f'<a href="{record.file_url}" target="_blank"><img src="{record.file_url}" style="max-width: 300px; max-height: 300px;" alt="Vista previa del archivo"/></a>'
-            else:
-                record.file_preview = ''
-
-    def fetch_and_create_expenses(self, journal_id=None, since=None, until=None, report_api_id=None):
-        journals = journal_id or self.env['account.journal'].search([('type', '=', 'bank'), ('employee_id.rindegastos_userid', '!=', False)])
-        
-        for journal in journals:
-            token = self.env.company.rindegastos_tokenid
-            if not token:
-                raise UserError(f"No se ha configurado un token de Rindegastos para la compañía {self.env.company.name}.")
-            
-            if not journal.employee_id or not journal.employee_id.rindegastos_userid:
-                raise UserError(f"No se ha configurado un empleado con User ID de Rindegastos para el diario {journal.name}.")
-
-            api_url = "https://api.rindegastos.com/v1/getExpenses"
-            headers = {"Authorization": f"Bearer {token}"}
-            page = 1
-            while True:
-                params = {
-                    'Status': 1,
-                    'UserId': journal.employee_id.rindegastos_userid,
-                    'ResultsPerPage': 100,
-                    'Page': page
-                }
-                # Solo agregar fechas si NO hay ReportId
-                if not report_api_id:
-                    if since:
-                        params['Since'] = since.strftime('%Y-%m-%d')
-                    if until:
-                        params['Until'] = until.strftime('%Y-%m-%d')
-                if report_api_id:
-                    params['ReportId'] = report_api_id
-                
-                try:
-                    response = requests.get(api_url, headers=headers, params=params, timeout=30)
-                    response.raise_for_status()
-                    data = response.json()
-                    transactions = data.get('Expenses', [])
-                    if not transactions:
-                        break
-
-                    for tx in transactions:
-                        if not all([tx.get('Id'), tx.get('IssueDate'), tx.get('Total')]):
-                            continue
-
-                        tx_date = datetime.strptime(tx['IssueDate'], '%Y-%m-%d').date()
-
-                        existing_tx = self.search([
-                            ('name', '=', str(tx['Id'])),
-                            ('journal_id', '=', journal.id),
-                            ('date', '=', tx_date),
-                            ('amount', '=', -float(tx['Total'])),
-                        ])
-                        if existing_tx:
-                            continue
-
-                        category = tx.get('Category', '') or 'Sin categoría'
-                        supplier = tx.get('Supplier', '') or 'Sin proveedor'
-                        tipo_documento = ''
-                        numero_documento = ''
-                        report_api_id_tx = tx.get('ReportId', '') or ''
-                        file_url = ''
-                        for extra_field in tx.get('ExtraFields', []):
-                            if extra_field.get('Name') == 'Tipo de Documento':
-                                tipo_documento = extra_field.get('Value', '') or 'Sin tipo'
-                            if extra_field.get('Name') == 'Numero de Documento':
-                                numero_documento = extra_field.get('Value', '') or ''
-                        payment_ref = f"{category} {supplier} {tipo_documento}" + (f" - {numero_documento}" if numero_documento else "").strip()
-
-                        files = tx.get('Files', [])
-                        if files and isinstance(files, list) and 'Large' in files[0]:
-                            file_url = files[0].get('Large', '')
-
-                        partner_id = False
-                        if tipo_documento in ['Factura Afecta', 'Factura Exenta', 'Honorarios']:
-                            for extra_field in tx.get('ExtraFields', []):
-                                if extra_field.get('Name') == 'Rut Proveedor':
-                                    rut_proveedor = extra_field.get('Value', '')
-                                    if rut_proveedor:
-                                        partner = self.env['res.partner'].search([('vat', '=', rut_proveedor)], limit=1)
-                                        partner_id = partner.id if partner else False
-                                    break
-
-                        # Enlace al report
-                        report_id = False
-                        if report_api_id_tx:
-                            report = self.env['rindegastos.report'].search([('name', '=', report_api_id_tx)], limit=1)
-                            if report:
-                                report_id = report.id
-                            else:
-                                _logger.warning(f"No se encontró report con ID {report_api_id_tx} para expense {tx['Id']}. Enlace no creado.")
-
-                        self.create({
-                            'name': str(tx['Id']),
-                            'date': tx_date,
-                            'amount': -float(tx['Total']),
-                            'description': payment_ref,
-                            'journal_id': journal.id,
-                            'partner_id': partner_id,
-                            'report_id': report_id,
-                            'file_url': file_url,
-                        })
-
-                    total_pages = data.get('Records', {}).get('Pages', 1)
-                    if page >= total_pages:
-                        break
-                    page += 1
-                except requests.exceptions.RequestException as e:
-                    raise UserError(f"Error al conectar con la API de Rindegastos: {str(e)}")
-
-    def create_account_move(self):
-        for expense in self:
-            if expense.state == 'posted':
+            record.file_preview = previews.get(record.file_url) or ''
+
+    def fetch_and_create_expenses(self, journal_id=None, since=None, until=None, report_api_id=None, report_map=None):
+        """Importa los expenses de los diarios; con ``report_map`` solo los de esos reports."""
+        journals = journal_id or self.env['account.journal'].search(self.env['rindegastos.report']._get_rindegastos_journal_domain())
+        jobs = [(journal, self._prepare_expense_params(journal, since, until, report_api_id)) for journal in journals]
+        return self._fetch_and_create_expense_jobs(jobs, report_map=report_map)
+
+    def _prepare_expense_params(self, journal, since=None, until=None, report_api_id=None):
+        if not journal.company_id.rindegastos_tokenid:
+            raise UserError(f"No se ha configurado un token de Rindegastos para la compañía {journal.company_id.name}.")
+
+        if not journal.employee_id or not journal.employee_id.rindegastos_userid:
+            raise UserError(f"No se ha configurado un empleado con User ID de Rindegastos para el diario {journal.name}.")
+
+        params = {
+            'Status': 1,
+            'UserId': journal.employee_id.rindegastos_userid,
+            'ResultsPerPage': 100,
+        }
+        # Solo agregar fechas si NO hay ReportId
+        if report_api_id:
+            params['ReportId'] = report_api_id
+        else:
+            if since:
+                params['Since'] = since.strftime('%Y-%m-%d')
+            if until:
+                params['Until'] = until.strftime('%Y-%m-%d')
+        return params
+
+    def _fetch_and_create_expense_jobs(self, jobs, report_map=None):
+        """Descarga en paralelo las páginas de cada (diario, params) y crea los expenses."""
+        expenses = self.browse()
+        if not jobs:
+            return expenses
+        clients = [journal.company_id._get_rindegastos_client() for journal, _params in jobs]
+        try:
+            results = run_concurrently(lambda job: self._fetch_expense_pages(*job), [
+                (client, journal, params) for client, (journal, params) in zip(clients, jobs)
+            ], total_workers(clients))
+        except RindegastosApiError as e:
+            raise UserError(f"Error al conectar con la API de Rindegastos: {str(e)}")
+
+        staging = self.env['rindegastos.api.page'].sudo()
+        for (journal, params), pages in zip(jobs, results):
+            staged = staging._stage_pages(journal, 'getExpenses', params, pages)
+            for _row, data in staged:
+                transactions = data.get('Expenses', [])
+                if transactions:
+                    expenses |= self.with_company(journal.company_id)._create_expenses_from_page(journal, transactions, report_map=report_map)
+            staging.union(*[row for row, _data in staged])._mark_processed()
+        return expenses
+
+    @api.model
+    def _fetch_expense_pages(self, client, journal, params):
+        with journal_scope(journal.id), sync_phase('fetch'):
+            return client.get_all_pages('getExpenses', params)
+
+    def _create_expenses_from_page(self, journal, transactions, report_map=None):
+        """Crea en lote los expenses nuevos de una página de la API y actualiza los que cambiaron."""
+        with journal_scope(journal.id):
+            with sync_phase('parse', self.env.cr):
+                vals_list = self._prepare_expense_vals_list(journal, transactions, report_map)
+            return self._upsert_vals_list(journal, vals_list)
+
+    @api.model
+    def _parse_extra_fields(self, tx):
+        """Convierte la lista ExtraFields en un dict Nombre -> Valor (gana la primera aparición)."""
+        extra = {}
+        for extra_field in tx.get('ExtraFields') or []:
+            if extra_field.get('Name'):
+                extra.setdefault(extra_field['Name'], extra_field.get('Value', '') or '')
+        return extra
+
+    def _prepare_expense_vals_list(self, journal, transactions, report_map=None):
+        """Transforma las transacciones de la página en valores de creación."""
+        restrict_to_map = report_map is not None
+        if report_map is None:
+            # Mapa Id -> report construido con una sola consulta para toda la página
+            report_names = {str(tx['ReportId']) for tx in transactions if tx.get('ReportId')}
+            report_map = {
+                report.name: report
+                for report in self.env['rindegastos.report'].search([('name', 'in', list(report_names))])
+            } if report_names else {}
+        # ExtraFields se interpreta una sola vez y los RUT de la página se resuelven con una consulta
+        extras = [self._parse_extra_fields(tx) for tx in transactions]
+        partner_map = self.env['res.partner']._get_partners_by_rut({
+            extra.get('Rut Proveedor') for extra in extras
+            if extra.get('Tipo de Documento') in PARTNER_DOCUMENT_TYPES and extra.get('Rut Proveedor')
+        })
+        vals_list = []
+        for tx, extra in zip(transactions, extras):
+            if not all([tx.get('Id'), tx.get('IssueDate'), tx.get('Total')]):
+                count_stat('rejected')
                 continue
 
-            if not expense.journal_id or not expense.journal_id.suspense_account_id or not expense.journal_id.default_account_id:
-                raise UserError("Configuración incompleta en el diario.")
-
-            statement_line_vals = {
-                'date': expense.date,
-                'payment_ref': expense.description or expense.name,
-                'ref': expense.name,
-                'amount': expense.amount,
-                'journal_id': expense.journal_id.id,
-                'partner_id': expense.partner_id.id if expense.partner_id else False,
-                'rindegastos_file_url': expense.file_url,
-            }
-            existing_statement_line = self.env['account.bank.statement.line'].search([
-                ('ref', '=', expense.name),
-                ('journal_id', '=', expense.journal_id.id),
-                ('date', '=', expense.date),
-                ('amount', '=', expense.amount),
-            ])
-            if existing_statement_line:
+            report_api_id_tx = str(tx.get('ReportId', '') or '')
+            if restrict_to_map and report_api_id_tx not in report_map:
                 continue
 
-            statement_line = self.env['account.bank.statement.line'].create(statement_line_vals)
-            move = statement_line.move_id
-            if move:
-                expense.write({'move_id': move.id, 'state': 'draft'})
+            tx_date = datetime.strptime(tx['IssueDate'], '%Y-%m-%d').date()
+
+            category = tx.get('Category', '') or 'Sin categoría'
+            supplier = tx.get('Supplier', '') or 'Sin proveedor'
+            tipo_documento = (extra.get('Tipo de Documento') or 'Sin tipo') if 'Tipo de Documento' in extra else ''
+            numero_documento = extra.get('Numero de Documento') or ''
+            file_url = ''
+            payment_ref = f"{category} {supplier} {tipo_documento}" + (f" - {numero_documento}" if numero_documento else "").strip()
+
+            files = tx.get('Files', [])
+            if files and isinstance(files, list) and 'Large' in files[0]:
+                file_url = files[0].get('Large', '')
+
+            partner_id = False
+            if tipo_documento in PARTNER_DOCUMENT_TYPES and extra.get('Rut Proveedor'):
+                rut_proveedor = self.env['res.partner']._normalize_rindegastos_rut(extra['Rut Proveedor'])
+                partner_id = partner_map.get(rut_proveedor, False)
+
+            # Enlace al report
+            report_id = False
+            if report_api_id_tx:
+                report = report_map.get(report_api_id_tx)
+                if report:
+                    report_id = report.id
+                else:
+                    _logger.warning(f"No se encontró report con ID {report_api_id_tx} para expense {tx['Id']}. Enlace no creado.")
+
+            vals_list.append({
+                'name': str(tx['Id']),
+                'date': tx_date,
+                'amount': -float(tx['Total']),
+                'description': payment_ref,
+                'document_number': numero_documento,
+                'journal_id': journal.id,
+                'partner_id': partner_id,
+                'report_id': report_id,
+                'file_url': file_url,
+            })
+        return vals_list
+
+    def _prepare_statement_line_vals(self):
+        self.ensure_one()
+        return {
+            'date': self.date,
+            'payment_ref': self.description or self.name,
+            'ref': self.name,
+            'amount': self.amount,
+            'journal_id': self.journal_id.id,
+            'partner_id': self.partner_id.id if self.partner_id else False,
+            'rindegastos_file_url': self.file_url,
+            'rindegastos_document_number': self.document_number,
+        }
 
     def action_open_rindegastos_mov_wizard(self):
         self.ensure_one()
@@ -0,0 +1,89 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosMatchWizard(models.TransientModel):
+    _name = 'rindegastos.match.wizard'
+    _description = 'Conciliación masiva de líneas de Rindegastos con facturas de proveedor'
+
+    journal_id = fields.Many2one('account.journal', string='Diario Contable', domain=[('type', '=', 'bank'), ('employee_id.rindegastos_userid', '!=', False)], required=True)
+    date_from = fields.Date(string='Desde', required=True, default=lambda self: fields.Date.context_today(self).replace(day=1))
+    date_to = fields.Date(string='Hasta', required=True, default=fields.Date.context_today)
+    tolerance = fields.Float(string='Tolerancia de Monto', default=lambda self: float(self.env['ir.config_parameter'].sudo().get_param('rindegastos.match_tolerance', 0.0)), help='Diferencia máxima aceptada entre la línea y el saldo de la factura')
+    line_ids = fields.One2many('rindegastos.match.wizard.line', 'wizard_id', string='Coincidencias Propuestas')
+
+    def _get_statement_lines(self):
+        return self.env['account.bank.statement.line'].search([
+            ('journal_id', '=', self.journal_id.id),
+            ('date', '>=', self.date_from),
+            ('date', '<=', self.date_to),
+            ('is_reconciled', '=', False),
+            ('amount', '<', 0),
+        ])
+
+    def action_propose(self):
+        """Ejecución en seco: calcula y muestra las coincidencias sin conciliar nada."""
+        self.ensure_one()
+        matches = self._get_statement_lines()._rindegastos_match_bills(self.tolerance)
+        self.line_ids = [(5, 0, 0)] + [(0, 0, {
+            'statement_line_id': line.id,
+            'move_id': bill.id,
+            'rule': rule,
+            'difference': difference,
+        }) for line, bill, rule, difference in matches]
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_apply(self):
+        """Concilia las coincidencias marcadas; si aún no se calcularon, las calcula y aplica todas."""
+        self.ensure_one()
+        if not self.line_ids:
+            self.action_propose()
+        reconciled, errors = 0, []
+        for match in self.line_ids.filtered('apply'):
+            try:
+                with self.env.cr.savepoint():
+                    match.statement_line_id._rindegastos_reconcile_bill(match.move_id)
+                reconciled += 1
+            except UserError as e:
+                errors.append(f"{match.statement_line_id.payment_ref}: {e}")
+        _logger.info(f"Conciliación Rindegastos del diario {self.journal_id.name}: {reconciled} líneas conciliadas, {len(errors)} errores.")
+        message = f"{reconciled} líneas conciliadas."
+        if errors:
+            message += f" {len(errors)} con errores: " + '; '.join(errors[:5])
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Conciliación con Facturas de Proveedor',
+                'message': message,
+                'sticky': bool(errors),
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }
+
+
+class RindegastosMatchWizardLine(models.TransientModel):
+    _name = 'rindegastos.match.wizard.line'
+    _description = 'Coincidencia propuesta entre línea de extracto y factura de proveedor'
+
+    wizard_id = fields.Many2one('rindegastos.match.wizard', required=True, ondelete='cascade')
+    apply = fields.Boolean(string='Conciliar', default=True)
+    statement_line_id = fields.Many2one('account.bank.statement.line', string='Línea de Extracto', required=True)
+    date = fields.Date(related='statement_line_id.date')
+    amount = fields.Monetary(related='statement_line_id.amount')
+    currency_id = fields.Many2one(related='statement_line_id.currency_id')
+    document_number = fields.Char(related='statement_line_id.rindegastos_document_number')
+    move_id = fields.Many2one('account.move', string='Factura', required=True)
+    partner_id = fields.Many2one(related='move_id.partner_id', string='Proveedor')
+    amount_residual = fields.Monetary(related='move_id.amount_residual', string='Saldo de la Factura')
+    rule = fields.Selection([('document', 'Número de Documento'), ('amount', 'Contacto y Monto')], string='Regla')
+    difference = fields.Float(string='Diferencia')
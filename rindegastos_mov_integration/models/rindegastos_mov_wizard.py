@@ -4,22 +4,26 @@ class RindegastosMovWizard(models.TransientModel):
     _name = 'rindegastos.mov.wizard'
     _description = 'Asistente unificado para importar reports y expenses de Rindegastos'
 
-    since = fields.Date(string='Fecha de Inicio', required=True, default=fields.Date.today)
+    since = fields.Date(string='Fecha de Inicio', required=True, compute='_compute_since', store=True, readonly=False, precompute=True)
     until = fields.Date(string='Fecha de Término', required=True, default=fields.Date.today)
     journal_id = fields.Many2one('account.journal', string='Diario Contable', domain=[('type', '=', 'bank'), ('employee_id.rindegastos_userid', '!=', False)], required=True)
+    force_transform = fields.Boolean(string='Reprocesar Sin Cambios', help='Vuelve a transformar las páginas aunque no hayan cambiado en Rindegastos, para completar en los gastos ya importados campos agregados después (p. ej. el número de documento)')
 
-    def action_import_mov(self):
-        """Importa reports y automáticamente sus expenses asociados usando los filtros del asistente."""
-        report_model = self.env['rindegastos.report']
+    @api.depends('journal_id')
+    def _compute_since(self):
+        """Por defecto solo se pide el delta desde la última sincronización del diario."""
+        for wizard in self:
+            since = wizard.journal_id._get_rindegastos_sync_since() if wizard.journal_id else None
+            wizard.since = since or fields.Date.context_today(wizard)
 
-        # Solo importa reports (y auto expenses dentro)
-        report_model.fetch_and_create_reports(
-            journal_id=self.journal_id,
-            since=self.since,
-            until=self.until
-        )
-        # Crea moves para nuevos registros (ya que expenses se importan dentro de fetch_reports)
-        reports = report_model.search([('journal_id', '=', self.journal_id.id), ('state', '=', 'draft')])
-        if reports:
-            reports.create_account_move()
-        return {'type': 'ir.actions.act_window_close'}
\ No newline at end of file
+    def action_import_mov(self):
+        """Encola la importación en segundo plano y abre su progreso."""
+        job = self.env['rindegastos.sync.job']._enqueue_range(self.journal_id, self.since, self.until, force_transform=self.force_transform)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Importación de Rindegastos',
+            'res_model': 'rindegastos.sync.job',
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
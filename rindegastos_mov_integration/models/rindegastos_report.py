@@ -1,6 +1,8 @@
-from odoo import models, fields, api
-import requests
+from odoo import models, fields, api, tools
 from odoo.exceptions import UserError
+from odoo.tools import float_compare
+from odoo.addons.rindegastos_userid.tools.common import RindegastosApiError, run_concurrently, total_workers
+from odoo.addons.rindegastos_userid.tools.sync_stats import count_stat, journal_scope, sync_phase
 from datetime import datetime
 import logging
 
@@ -8,6 +10,7 @@ _logger = logging.getLogger(__name__)
 
 class RindegastosReport(models.Model):
     _name = 'rindegastos.report'
+    _inherit = ['rindegastos.statement.mixin']
     _description = 'Reportes desde Rindegastos API'
 
     name = fields.Char(string='Referencia', required=True)
@@ -27,6 +30,11 @@ class RindegastosReport(models.Model):
     title = fields.Char(string='Título', help='Título del reporte de Rindegastos')
     expense_ids = fields.One2many('rindegastos.expense', 'report_id', string='Expenses Relacionados')
 
+    def init(self):
+        # Respalda el upsert por (diario, Id externo)
+        tools.drop_index(self._cr, 'rindegastos_report_dedup_index', self._table)
+        tools.create_index(self._cr, 'rindegastos_report_upsert_index', self._table, ['journal_id', 'name'])
+
     @api.depends('journal_id.employee_id')
     def _compute_employee_name(self):
         for record in self:
@@ -34,144 +42,174 @@ class RindegastosReport(models.Model):
 
     @api.depends('file_url')
     def _compute_file_preview(self):
+        previews = self.env['rindegastos.thumbnail']._render_previews(self.mapped('file_url'))
         for record in self:
-            if record.file_url:
-                record.file_preview = f'<a href="{record.file_url}" target="_blank"><img src="{record.file_url}" style="max-width: 300px; max-height: 300px;" alt="Vista previa del archivo"/></a>'
-            else:
-                record.file_preview = ''
+            record.file_preview = previews.get(record.file_url) or ''
 
     @api.depends('amount', 'report_total_approved')
     def _compute_total_difference(self):
         for record in self:
             record.total_difference = record.amount - record.report_total_approved
 
-    def fetch_and_create_reports(self, journal_id=None, since=None, until=None):
-        journals = journal_id or self.env['account.journal'].search([('type', '=', 'bank'), ('employee_id.rindegastos_userid', '!=', False)])
-        
-        for journal in journals:
-            token = self.env.company.rindegastos_tokenid
-            if not token:
-                raise UserError(f"No se ha configurado un token de Rindegastos para la compañía {self.env.company.name}.")
-            
-            if not journal.employee_id or not journal.employee_id.rindegastos_userid:
-                raise UserError(f"No se ha configurado un empleado con User ID de Rindegastos para el diario {journal.name}.")
-
-            api_url = "https://api.rindegastos.com/v1/getExpenseReports"
-            headers = {"Authorization": f"Bearer {token}"}
-            page = 1
-            while True:
-                params = {
-                    'Status': 1,
-                    'UserId': journal.employee_id.rindegastos_userid,
-                    'ResultsPerPage': 100,
-                    'Page': page
-                }
-                if since:
-                    params['Since'] = since.strftime('%Y-%m-%d')
-                if until:
-                    params['Until'] = until.strftime('%Y-%m-%d')
-                
-                try:
-                    response = requests.get(api_url, headers=headers, params=params, timeout=30)
-                    response.raise_for_status()
-                    data = response.json()
-                    reports = data.get('ExpenseReports', [])
-                    if not reports:
-                        break
-
-                    for report in reports:
-                        if not all([report.get('Id'), report.get('SendDate'), report.get('ReportTotal')]):
-                            continue
-
-                        report_date = datetime.strptime(report['SendDate'], '%Y-%m-%d').date()
-
-                        existing_report = self.search([
-                            ('name', '=', str(report['Id'])),
-                            ('journal_id', '=', journal.id),
-                            ('date', '=', report_date),
-                            ('amount', '=', float(report['ReportTotal'])),
-                        ])
-                        if existing_report:
-                            continue
-
-                        file_url = ''
-                        files = report.get('Files', [])
-                        if files and isinstance(files, list) and 'Large' in files[0]:
-                            file_url = files[0].get('Large', '')
-
-                        new_report = self.create({
-                            'name': str(report['Id']),
-                            'date': report_date,
-                            'amount': float(report['ReportTotal']),
-                            'note': report.get('Note', ''),
-                            'journal_id': journal.id,
-                            'report_number': report.get('ReportNumber', ''),
-                            'policy_name': report.get('PolicyName', ''),
-                            'file_url': file_url,
-                            'report_total_approved': float(report.get('ReportTotalApproved', 0.0)),
-                            'title': report.get('Title', ''),
-                        })
-
-                        # Importa automáticamente los expenses asociados a este report
-                        self.env['rindegastos.expense'].fetch_and_create_expenses(
-                            journal_id=journal,
-                            since=since,
-                            until=until,
-                            report_api_id=report['Id']
-                        )
-
-                        # Crea el move para este report
-                        new_report.create_account_move()
-
-                        # Crea moves para los nuevos expenses asociados
-                        new_expenses = self.env['rindegastos.expense'].search([
-                            ('report_id', '=', new_report.id),
-                            ('state', '=', 'draft')
-                        ])
-                        if new_expenses:
-                            new_expenses.create_account_move()
-
-                    total_pages = data.get('Records', {}).get('Pages', 1)
-                    if page >= total_pages:
-                        break
-                    page += 1
-                except requests.exceptions.RequestException as e:
-                    raise UserError(f"Error al conectar con la API de Rindegastos: {str(e)}")
-
-    def create_account_move(self):
-        for report in self:
-            if report.state == 'posted':
-                continue
+    def fetch_and_create_reports(self, journal_id=None, since=None, until=None, bulk_expenses=True):
+        """Importa los reports de cada diario y sus expenses, completando por ReportId los reports incompletos."""
+        journals = journal_id or self.env['account.journal'].search(self._get_rindegastos_journal_domain())
+        expense_model = self.env['rindegastos.expense']
+        if not journals:
+            return
+
+        jobs = [
+            (journal.company_id._get_rindegastos_client(), journal, self._prepare_report_params(journal, since, until))
+            for journal in journals
+        ]
+        try:
+            results = run_concurrently(lambda job: self._fetch_report_pages(*job), jobs, total_workers(job[0] for job in jobs))
+        except RindegastosApiError as e:
+            raise UserError(f"Error al conectar con la API de Rindegastos: {str(e)}")
+
+        new_reports_by_journal = {}
+        staging = self.env['rindegastos.api.page'].sudo()
+        for (_client, journal, params), pages in zip(jobs, results):
+            new_reports = self.browse()
+            staged = staging._stage_pages(journal, 'getExpenseReports', params, pages)
+            for _row, data in staged:
+                reports = data.get('ExpenseReports', [])
+                if reports:
+                    new_reports |= self.with_company(journal.company_id)._create_reports_from_page(journal, reports)
+            staging.union(*[row for row, _data in staged])._mark_processed()
+            if new_reports:
+                new_reports_by_journal[journal] = new_reports
+        if not new_reports_by_journal:
+            return
+
+        # Importa los expenses asociados a los reports nuevos
+        all_new_reports = self.browse().union(*new_reports_by_journal.values())
+        report_map = {report.name: report for report in all_new_reports}
+        if bulk_expenses:
+            new_expenses = expense_model._fetch_and_create_expense_jobs([
+                (journal, expense_model._prepare_expense_params(journal, since, until))
+                for journal in new_reports_by_journal
+            ], report_map=report_map)
+            # Los reports con expenses fuera de la ventana (o sin ninguno) se consultan individualmente
+            pending_reports = all_new_reports._get_incomplete_reports()
+        else:
+            new_expenses = expense_model.browse()
+            pending_reports = all_new_reports
+        new_expenses |= expense_model._fetch_and_create_expense_jobs([
+            (report.journal_id, expense_model._prepare_expense_params(report.journal_id, report_api_id=report.name))
+            for report in pending_reports
+        ], report_map=report_map)
+
+        # Crea los moves de los reports nuevos y de sus expenses
+        all_new_reports.create_account_move()
+        new_expenses = new_expenses.filtered(lambda e: e.state == 'draft')
+        if new_expenses:
+            new_expenses.create_account_move()
+
+    def _get_incomplete_reports(self):
+        """Reports cuyos expenses importados no suman el ReportTotal informado por la API."""
+        if not self:
+            return self
+        expense_model = self.env['rindegastos.expense']
+        expense_model.flush_model(['report_id', 'amount'])
+        totals = dict(expense_model._read_group([('report_id', 'in', self.ids)], ['report_id'], ['amount:sum']))
+        return self.filtered(lambda report: float_compare(
+            -totals.get(report, 0.0),
+            report.amount,
+            precision_rounding=(report.journal_id.currency_id or report.journal_id.company_id.currency_id).rounding,
+        ) != 0)
+
+    @api.model
+    def _get_rindegastos_journal_domain(self):
+        """Diarios sincronizables: bancarios, con empleado de Rindegastos y compañía con token."""
+        return [
+            ('type', '=', 'bank'),
+            ('employee_id.rindegastos_userid', '!=', False),
+            ('company_id.rindegastos_tokenid', '!=', False),
+        ]
+
+    def _prepare_report_params(self, journal, since=None, until=None):
+        if not journal.company_id.rindegastos_tokenid:
+            raise UserError(f"No se ha configurado un token de Rindegastos para la compañía {journal.company_id.name}.")
+
+        if not journal.employee_id or not journal.employee_id.rindegastos_userid:
+            raise UserError(f"No se ha configurado un empleado con User ID de Rindegastos para el diario {journal.name}.")
+
+        params = {
+            'Status': 1,
+            'UserId': journal.employee_id.rindegastos_userid,
+            'ResultsPerPage': 100,
+        }
+        if since:
+            params['Since'] = since.strftime('%Y-%m-%d')
+        if until:
+            params['Until'] = until.strftime('%Y-%m-%d')
+        return params
 
-            if not report.journal_id or not report.journal_id.suspense_account_id or not report.journal_id.default_account_id:
-                raise UserError("Configuración incompleta en el diario.")
-
-            statement_line_vals = {
-                'date': report.date,
-                'payment_ref': f"Informe {report.name}-{report.report_number}: {report.title}" if report.report_number and report.title else report.note or report.name,
-                'ref': report.name,
-                'amount': report.report_total_approved,  # Positivo para reports
-                'journal_id': report.journal_id.id,
-                'rindegastos_file_url': report.file_url,  # Poblado para bank statement
-            }
-            existing_statement_line = self.env['account.bank.statement.line'].search([
-                ('ref', '=', report.name),
-                ('journal_id', '=', report.journal_id.id),
-                ('date', '=', report.date),
-                ('amount', '=', report.report_total_approved),
-            ])
-            if existing_statement_line:
+    @api.model
+    def _fetch_report_pages(self, client, journal, params):
+        with journal_scope(journal.id), sync_phase('fetch'):
+            return client.get_all_pages('getExpenseReports', params)
+
+    def _create_reports_from_page(self, journal, reports):
+        """Crea en lote los reports nuevos de una página de la API y actualiza los que cambiaron."""
+        with journal_scope(journal.id):
+            with sync_phase('parse', self.env.cr):
+                vals_list = self._prepare_report_vals_list(journal, reports)
+            return self._upsert_vals_list(journal, vals_list)
+
+    def _prepare_report_vals_list(self, journal, reports):
+        """Transforma los reports de la página en valores de creación."""
+        vals_list = []
+        for report in reports:
+            if not all([report.get('Id'), report.get('SendDate'), report.get('ReportTotal')]):
+                count_stat('rejected')
                 continue
 
-            statement_line = self.env['account.bank.statement.line'].create(statement_line_vals)
-            move = statement_line.move_id
-            if move:
-                report.write({'move_id': move.id, 'state': 'draft'})
+            report_date = datetime.strptime(report['SendDate'], '%Y-%m-%d').date()
+
+            file_url = ''
+            files = report.get('Files', [])
+            if files and isinstance(files, list) and 'Large' in files[0]:
+                file_url = files[0].get('Large', '')
+
+            vals_list.append({
+                'name': str(report['Id']),
+                'date': report_date,
+                'amount': float(report['ReportTotal']),
+                'note': report.get('Note', ''),
+                'journal_id': journal.id,
+                'report_number': report.get('ReportNumber', ''),
+                'policy_name': report.get('PolicyName', ''),
+                'file_url': file_url,
+                'report_total_approved': float(report.get('ReportTotalApproved', 0.0)),
+                'title': report.get('Title', ''),
+            })
+        return vals_list
+
+    def _prepare_statement_line_vals(self):
+        self.ensure_one()
+        return {
+            'date': self.date,
+            'payment_ref': f"Informe {self.name}-{self.report_number}: {self.title}" if self.report_number and self.title else self.note or self.name,
+            'ref': self.name,
+            'amount': self.report_total_approved,  # Positivo para reports
+            'journal_id': self.journal_id.id,
+            'rindegastos_file_url': self.file_url,  # Poblado para bank statement
+        }
 
     @api.model
     def cron_fetch_mov(self):
-        """Tarea unificada: importa reports y automáticamente sus expenses asociados."""
-        self.fetch_and_create_reports()
+        """Tarea unificada: encola un job por diario y dispara el procesamiento de la cola."""
+        job_model = self.env['rindegastos.sync.job']
+        # Cada compañía con token encola sus diarios en su propio entorno
+        for company in self.env['res.company'].sudo().search([('rindegastos_tokenid', '!=', False)]):
+            report_model = self.with_company(company)
+            journals = report_model.env['account.journal'].search(
+                report_model._get_rindegastos_journal_domain() + [('company_id', '=', company.id)]
+            )
+            job_model.with_company(company)._enqueue(journals, fields.Date.context_today(report_model))
+        self.env.ref('rindegastos_mov_integration.cron_process_rindegastos_sync_jobs')._trigger()
 
     def action_open_rindegastos_mov_wizard(self):
         self.ensure_one()
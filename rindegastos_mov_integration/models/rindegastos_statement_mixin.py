@@ -0,0 +1,141 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.addons.rindegastos_userid.tools.sync_stats import count_stat, sync_phase
+import hashlib
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Claves de upsert: no se reescriben al actualizar
+UPSERT_KEYS = ('name', 'journal_id')
+
+
+class RindegastosStatementMixin(models.AbstractModel):
+    _name = 'rindegastos.statement.mixin'
+    _description = 'Generación de líneas de extracto para registros de Rindegastos'
+
+    content_hash = fields.Char(string='Hash del Contenido', readonly=True, copy=False, help='Hash de los valores importados desde Rindegastos')
+
+    # Campos que no vienen del payload sino de lo que ya existe en Odoo (report enlazado, contacto por RUT)
+    _rindegastos_link_fields = ()
+
+    @api.model
+    def _hash_vals(self, vals):
+        """Hash de los valores del payload de la API, sin los enlaces resueltos en Odoo."""
+        payload_vals = {key: value for key, value in vals.items() if key not in self._rindegastos_link_fields}
+        return hashlib.sha256(json.dumps(payload_vals, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _load_existing_hashes(self, journal, names):
+        """{Id externo: {id, content_hash, enlaces}} de los registros ya importados del diario."""
+        if not names:
+            return {}
+        existing = self.search_read([
+            ('name', 'in', list(names)),
+            ('journal_id', '=', journal.id),
+        ], ['name', 'content_hash', *self._rindegastos_link_fields], load=None)
+        return {rec['name']: rec for rec in existing}
+
+    def _upsert_vals_list(self, journal, vals_list):
+        """Crea los registros nuevos, actualiza los cambiados o con enlaces nuevos y devuelve los creados."""
+        with sync_phase('dedup', self.env.cr):
+            names = {vals['name'] for vals in vals_list}
+            existing = self._load_existing_hashes(journal, names)
+            seen = self.env['rindegastos.archive']._get_archived_names(self._name, journal, names - set(existing))
+            to_create, to_update = [], {}
+            for vals in vals_list:
+                if vals['name'] in seen:
+                    count_stat('duplicates')  # Ya archivado o repetido dentro de la misma página
+                    continue
+                seen.add(vals['name'])
+                vals = dict(vals, content_hash=self._hash_vals(vals))
+                record = existing.get(vals['name'])
+                if record is None:
+                    to_create.append(vals)
+                    continue
+                links = {
+                    field: vals[field] for field in self._rindegastos_link_fields
+                    if vals.get(field) and vals[field] != record[field]
+                }
+                if record['content_hash'] != vals['content_hash']:
+                    payload_vals = {key: value for key, value in vals.items() if key not in self._rindegastos_link_fields}
+                    to_update[record['id']] = dict(payload_vals, **links)
+                elif links:
+                    to_update[record['id']] = links
+                else:
+                    count_stat('duplicates')
+        with sync_phase('create', self.env.cr):
+            records = self.create(to_create)
+            self._update_changed(to_update)
+        count_stat('created', len(records))
+        count_stat('updated', len(to_update))
+        return records
+
+    def _update_changed(self, updates):
+        """Aplica {id: vals} y propaga los cambios a las líneas de extracto no conciliadas."""
+        if not updates:
+            return
+        ids_by_vals = {}
+        for record_id, vals in updates.items():
+            vals = {key: value for key, value in vals.items() if key not in UPSERT_KEYS}
+            ids_by_vals.setdefault(json.dumps(vals, sort_keys=True, default=str), (vals, []))[1].append(record_id)
+        for vals, record_ids in ids_by_vals.values():
+            self.browse(record_ids).write(vals)
+
+        records = self.browse(list(updates)).filtered(lambda r: r.move_id and r.state != 'posted')
+        lines = self.env['account.bank.statement.line'].search([('move_id', 'in', records.move_id.ids)])
+        line_by_move = {line.move_id.id: line for line in lines}
+        for record in records:
+            line = line_by_move.get(record.move_id.id)
+            if not line:
+                continue
+            if line.is_reconciled:
+                _logger.warning(f"{record._description} {record.name} cambió en Rindegastos pero su línea de extracto ya está conciliada; no se actualiza.")
+                continue
+            vals = record._prepare_statement_line_vals()
+            vals.pop('journal_id', None)
+            line.write(vals)
+
+    def _prepare_statement_line_vals(self):
+        """Valores de la línea de extracto bancario del registro; lo implementa cada modelo."""
+        raise NotImplementedError()
+
+    def create_account_move(self):
+        """Crea en lote las líneas de extracto que faltan, por compañía."""
+        records = self.filtered(lambda r: r.state != 'posted')
+        if not records:
+            return
+        with sync_phase('statement', self.env.cr):
+            for company, company_records in records.grouped(lambda r: r.journal_id.company_id).items():
+                company_records.with_company(company)._create_statement_lines()
+
+    def _create_statement_lines(self):
+        for record in self:
+            if not record.journal_id or not record.journal_id.suspense_account_id or not record.journal_id.default_account_id:
+                raise UserError("Configuración incompleta en el diario.")
+
+        statement_line_model = self.env['account.bank.statement.line']
+        existing = statement_line_model.search_read([
+            ('ref', 'in', list(set(self.mapped('name')))),
+            ('journal_id', 'in', self.journal_id.ids),
+        ], ['ref', 'journal_id', 'date', 'amount'])
+        existing_keys = {(line['ref'], line['journal_id'][0], line['date'], line['amount']) for line in existing}
+
+        to_create = self.browse()
+        vals_list = []
+        for record in self:
+            vals = record._prepare_statement_line_vals()
+            key = (vals['ref'], vals['journal_id'], vals['date'], vals['amount'])
+            if key in existing_keys:
+                continue
+            existing_keys.add(key)
+            to_create |= record
+            vals_list.append(vals)
+        if not vals_list:
+            return
+
+        statement_lines = statement_line_model.create(vals_list)
+        for record, line in zip(to_create, statement_lines):
+            if line.move_id:
+                record.move_id = line.move_id
+                record.state = 'draft'
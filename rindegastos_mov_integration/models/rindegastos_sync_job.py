@@ -0,0 +1,393 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.addons.rindegastos_userid.tools.common import MAX_RESULTS_PER_PAGE, RindegastosApiError, run_concurrently, total_workers
+from odoo.addons.rindegastos_userid.tools.sync_stats import journal_scope, sync_phase
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosSyncJob(models.Model):
+    _name = 'rindegastos.sync.job'
+    _description = 'Unidad de sincronización de Rindegastos por diario'
+    _order = 'id'
+
+    journal_id = fields.Many2one('account.journal', string='Diario Contable', required=True, ondelete='cascade', index=True)
+    company_id = fields.Many2one('res.company', related='journal_id.company_id', store=True)
+    since = fields.Date(string='Desde')
+    until = fields.Date(string='Hasta')
+    trigger = fields.Selection([('cron', 'Tarea Programada'), ('wizard', 'Asistente')], string='Origen', default='cron', required=True)
+    user_id = fields.Many2one('res.users', string='Solicitado por', help='Usuario que recibe la notificación al terminar')
+    force_transform = fields.Boolean(string='Reprocesar Sin Cambios', readonly=True, help='Transforma también las páginas cuyo contenido no cambió desde la última descarga')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+        ('cancelled', 'Cancelado'),
+    ], string='Estado', default='pending', required=True, index=True)
+    cancel_requested = fields.Boolean(string='Cancelación Solicitada', readonly=True)
+    phase = fields.Selection([
+        ('reports', 'Reports'),
+        ('expenses', 'Expenses'),
+        ('fallback', 'Expenses por Report'),
+    ], string='Fase', default='reports', required=True)
+    page = fields.Integer(string='Próxima Página', default=1, help='Páginas ya descargadas de la fase actual más uno')
+    total_pages = fields.Integer(string='Páginas', help='Total de páginas de la fase actual; 0 si aún no se conoce')
+    windows = fields.Json(string='Ventanas', help='Checkpoint de la fase actual: ventanas de fechas con sus páginas, próxima página e intentos')
+    last_report_id = fields.Integer(string='Último Report', help='Checkpoint de la fase por report: último report consultado')
+    pages_fetched = fields.Integer(string='Páginas Descargadas')
+    pages_failed = fields.Integer(string='Páginas Fallidas', help='Páginas que no se pudieron transformar; quedan en staging para reprocesarlas')
+    attempts = fields.Integer(string='Intentos')
+    last_error = fields.Text(string='Último Error', readonly=True)
+    reports_created = fields.Integer(string='Reports Creados')
+    expenses_created = fields.Integer(string='Expenses Creados')
+
+    @api.model
+    def _enqueue(self, journals, until):
+        """Crea un job pendiente por diario, salvo que ya tenga uno en cola o uno para la misma fecha de término."""
+        queued = self.search([
+            ('journal_id', 'in', journals.ids),
+            ('trigger', '=', 'cron'),
+            '|', ('state', '=', 'pending'), ('until', '=', until),
+        ]).journal_id
+        return self.create([{
+            'journal_id': journal.id,
+            'since': journal._get_rindegastos_sync_since(),
+            'until': until,
+        } for journal in journals - queued])
+
+    @api.model
+    def _enqueue_range(self, journal, since, until, force_transform=False):
+        """Encola la importación del asistente, o devuelve el job pendiente igual, y dispara la cola."""
+        job = self.search([
+            ('journal_id', '=', journal.id),
+            ('since', '=', since),
+            ('until', '=', until),
+            ('force_transform', '=', force_transform),
+            ('state', '=', 'pending'),
+            ('cancel_requested', '=', False),
+        ], limit=1)
+        if not job:
+            job = self.create({
+                'journal_id': journal.id,
+                'since': since,
+                'until': until,
+                'trigger': 'wizard',
+                'user_id': self.env.uid,
+                'force_transform': force_transform,
+            })
+        self.env.ref('rindegastos_mov_integration.cron_process_rindegastos_sync_jobs')._trigger()
+        return job
+
+    @api.model
+    def cron_process_queue(self):
+        """Procesa la cola por origen (primero el asistente) y se vuelve a disparar si no termina."""
+        time_budget = int(self.env['ir.config_parameter'].sudo().get_param('rindegastos.sync_time_budget', 600))
+        deadline = time.monotonic() + time_budget
+        drained = True
+        for trigger in ('wizard', 'cron'):
+            if not self.search_count([('state', '=', 'pending'), ('trigger', '=', trigger)]):
+                continue
+            with self.env['rindegastos.sync.run']._track(trigger):
+                drained = self._process_queue(trigger, deadline)
+            if not drained:
+                break
+        if not drained:
+            self.env.ref('rindegastos_mov_integration.cron_process_rindegastos_sync_jobs')._trigger()
+
+    def action_cancel(self):
+        """Solicita la cancelación; el job se detiene antes de su próximo trozo de páginas."""
+        self.filtered(lambda job: job.state == 'pending').write({'cancel_requested': True})
+
+    def action_refresh(self):
+        return True
+
+    @api.model
+    def _process_queue(self, trigger, deadline):
+        """Procesa por trozos los jobs del origen hasta ``deadline``; devuelve True si la cola quedó vacía."""
+        params = self.env['ir.config_parameter'].sudo()
+        chunk_pages = int(params.get_param('rindegastos.sync_chunk_pages', 10))
+        max_attempts = int(params.get_param('rindegastos.sync_max_attempts', 5))
+        per_company = max(int(params.get_param('rindegastos.fetch_workers', 4)), 1)
+        failed_ids = []  # Los jobs que fallan se reintentan en la próxima ejecución, no en esta
+        while time.monotonic() < deadline:
+            jobs = self._next_batch(trigger, failed_ids, per_company)
+            if not jobs:
+                return not self.search_count([('state', '=', 'pending'), ('trigger', '=', trigger)])
+            specs = [dict(job._prepare_chunk(chunk_pages), max_attempts=max_attempts) for job in jobs]
+            # Los trozos de varios diarios y compañías se descargan en paralelo
+            clients = [spec['client'] for spec in specs if 'client' in spec]
+            results = run_concurrently(lambda spec: self._fetch_chunk(spec, chunk_pages), specs, total_workers(clients))
+            # Transacción nueva tras la descarga: la cancelación se lee ya confirmada
+            self.env.cr.commit()
+            for job, spec, result in zip(jobs, specs, results):
+                if job._lock_cancel_requested():
+                    job._cancel()
+                    self.env.cr.commit()
+                    continue
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    job._apply_chunk(spec, result)
+                except (RindegastosApiError, UserError, ValueError, KeyError) as e:
+                    self.env.cr.rollback()
+                    failed_ids.append(job.id)
+                    job._record_failure(e, max_attempts)
+                self.env.cr.commit()
+        return False
+
+    @api.model
+    def _next_batch(self, trigger, exclude_ids, per_company):
+        """Próximos jobs pendientes del origen, hasta ``per_company`` por compañía, cada uno en el entorno de su compañía."""
+        pending = self.search([('state', '=', 'pending'), ('trigger', '=', trigger), ('id', 'not in', exclude_ids)])
+        for job in pending.filtered('cancel_requested'):
+            job._cancel()
+        pending = pending.filtered(lambda job: not job.cancel_requested)
+        return [
+            job.with_company(company)
+            for company, company_jobs in pending.grouped('company_id').items()
+            for job in company_jobs[:per_company]
+        ]
+
+    def _lock_cancel_requested(self):
+        """Bloquea la fila del job hasta el próximo commit y devuelve si se pidió cancelarlo."""
+        self.ensure_one()
+        self.env.cr.execute(f'SELECT cancel_requested FROM "{self._table}" WHERE id = %s FOR UPDATE', [self.id])
+        row = self.env.cr.fetchone()
+        self.invalidate_recordset(['cancel_requested'])
+        return bool(row and row[0])
+
+    def _cancel(self):
+        self.write({'state': 'cancelled'})
+        self._notify_user('Importación de Rindegastos cancelada', 'warning')
+
+    def _notify_user(self, title, notification_type):
+        """Avisa por el bus al usuario que pidió la importación desde el asistente."""
+        self.ensure_one()
+        if not self.user_id:
+            return
+        self.env['bus.bus']._sendone(self.user_id.partner_id, 'simple_notification', {
+            'title': title,
+            'message': f"{self.journal_id.name}: {self.pages_fetched} páginas, {self.reports_created} reports y "
+                       f"{self.expenses_created} expenses creados."
+                       + (f" {self.pages_failed} páginas no se pudieron transformar." if self.pages_failed else '')
+                       + (f" {self.last_error}" if self.last_error else ''),
+            'type': notification_type,
+            'sticky': False,
+        })
+
+    def _prepare_chunk(self, chunk_pages):
+        """Arma en el hilo del ORM lo que se descargará en el próximo trozo del job."""
+        self.ensure_one()
+        journal = self.journal_id
+        spec = {'journal_id': journal.id}
+        if self._get_staged_pages():
+            # Un trozo anterior quedó descargado pero sin transformar: se reanuda sin red
+            spec['transform_only'] = True
+            return spec
+        try:
+            if self.phase in ('reports', 'expenses'):
+                if self.phase == 'reports':
+                    endpoint = 'getExpenseReports'
+                    params = self.env['rindegastos.report']._prepare_report_params(journal, self.since, self.until)
+                else:
+                    endpoint = 'getExpenses'
+                    params = self.env['rindegastos.expense']._prepare_expense_params(journal, self.since, self.until)
+                spec.update({'endpoint': endpoint, 'params': params})
+                if not self.windows:
+                    spec['plan'] = True  # Primer trozo de la fase: se planifican las ventanas
+                else:
+                    spec['windows'] = self._next_window_pages(chunk_pages)
+            else:
+                spec['reports'] = [
+                    (report, self.env['rindegastos.expense']._prepare_expense_params(journal, report_api_id=report.name))
+                    for report in self._get_fallback_reports(chunk_pages)
+                ]
+            spec['client'] = self.company_id._get_rindegastos_client()
+        except UserError as e:
+            spec['error'] = e
+        return spec
+
+    @api.model
+    def _fetch_chunk(self, spec, chunk_pages):
+        """Descarga un trozo con el cliente de su compañía."""
+        if 'error' in spec:
+            return spec['error']
+        if spec.get('transform_only'):
+            return None
+        client = spec['client']
+        try:
+            with journal_scope(spec['journal_id']), sync_phase('fetch'):
+                if 'reports' in spec:
+                    return [client.get_all_pages('getExpenses', params) for _report, params in spec['reports']]
+                if spec.get('plan'):
+                    return self._plan_windows(client, spec['endpoint'], spec['params'])
+                # Las ventanas se descargan en paralelo y cada una falla por separado
+                return run_concurrently(
+                    lambda item: self._fetch_window_pages(client, spec['endpoint'], *item),
+                    spec['windows'],
+                    client.max_workers,
+                )
+        except RindegastosApiError as e:
+            return e
+
+    @api.model
+    def _plan_windows(self, client, endpoint, params):
+        """Ventanas de la fase: adaptativas si el job tiene rango completo, si no una sola con todas las páginas."""
+        if params.get('Since') and params.get('Until'):
+            return client.plan_windows(endpoint, params)
+        records = client.count_records(endpoint, params)
+        if not records:
+            return []
+        per_page = min(MAX_RESULTS_PER_PAGE, records)
+        return [(dict(params, ResultsPerPage=per_page), -(-records // per_page))]
+
+    @api.model
+    def _fetch_window_pages(self, client, endpoint, index, params, start, count):
+        try:
+            return client.get_pages(endpoint, params, range(start, start + count))
+        except RindegastosApiError as e:
+            return e
+
+    def _next_window_pages(self, chunk_pages):
+        """Reparte hasta ``chunk_pages`` páginas entre las ventanas pendientes: [(índice, params, desde, cantidad)]."""
+        items, budget = [], chunk_pages
+        for index, window in enumerate(self.windows):
+            remaining = window['pages'] - window['next'] + 1
+            if remaining <= 0 or budget <= 0:
+                continue
+            count = min(remaining, budget)
+            items.append((index, window['params'], window['next'], count))
+            budget -= count
+        return items
+
+    def _get_fallback_reports(self, limit):
+        """Reports incompletos de la ventana del job, en orden de id desde el checkpoint."""
+        domain = [
+            ('journal_id', '=', self.journal_id.id),
+            ('id', '>', self.last_report_id),
+        ]
+        if self.since:
+            domain.append(('date', '>=', self.since))
+        if self.until:
+            domain.append(('date', '<=', self.until))
+        return self.env['rindegastos.report'].search(domain, order='id')._get_incomplete_reports()[:limit]
+
+    def _get_staged_pages(self):
+        """Páginas que este job descargó y aún no transforma."""
+        return self.env['rindegastos.api.page'].sudo().search([
+            ('job_id', '=', self.id),
+            ('state', '=', 'staged'),
+        ])
+
+    def _apply_chunk(self, spec, result):
+        """Guarda el trozo en staging con su checkpoint, confirma y luego lo transforma."""
+        self.ensure_one()
+        if not spec.get('transform_only'):
+            if self.phase == 'fallback' and not spec['reports']:
+                self._finish()
+                return
+            self._stage_chunk(spec, result)
+            self.env.cr.commit()
+            # El commit liberó el bloqueo: se vuelve a tomar antes de transformar
+            if self._lock_cancel_requested():
+                self._cancel()
+                return
+        self._transform_staged()
+
+    def _stage_chunk(self, spec, result):
+        """Guarda las páginas descargadas en staging y avanza el checkpoint del job."""
+        journal = self.journal_id
+        staging = self.env['rindegastos.api.page'].sudo()
+        if self.phase == 'fallback':
+            for (_report, params), pages in zip(spec['reports'], result):
+                staging._stage_pages(journal, 'getExpenses', params, pages, job=self, force=self.force_transform)
+            self.write({
+                'last_report_id': spec['reports'][-1][0].id,
+                'pages_fetched': self.pages_fetched + sum(len(pages) for pages in result),
+                'attempts': 0,
+            })
+            return
+
+        if spec.get('plan'):
+            windows = [{'params': params, 'pages': pages, 'next': 1, 'attempts': 0} for params, pages in result]
+            self._write_windows(windows)
+            return
+
+        windows = [dict(window) for window in self.windows]
+        fetched, errors = 0, []
+        for (index, params, start, _count), payloads in zip(spec['windows'], result):
+            window = windows[index]
+            if isinstance(payloads, Exception):
+                # La ventana se reintenta en el próximo trozo; las demás siguen avanzando
+                window['attempts'] += 1
+                window['error'] = str(payloads)
+                errors.append((window, payloads))
+                continue
+            staging._stage_pages(journal, spec['endpoint'], params, payloads, start=start, job=self, force=self.force_transform)
+            pages = max([window['pages']] + [int((payload.get('Records') or {}).get('Pages') or 0) for payload in payloads])
+            window.update(next=start + len(payloads), pages=pages, attempts=0, error=False)
+            fetched += len(payloads)
+        if errors and not fetched:
+            raise errors[0][1]
+        self._write_windows(windows, pages_fetched=self.pages_fetched + fetched)
+        exhausted = [error for window, error in errors if window['attempts'] >= spec['max_attempts']]
+        if exhausted:
+            self._fail(exhausted[0])
+
+    def _write_windows(self, windows, **vals):
+        """Guarda el checkpoint de ventanas y pasa a la fase siguiente cuando todas terminaron."""
+        if all(window['next'] > window['pages'] for window in windows):
+            vals.update(phase='expenses' if self.phase == 'reports' else 'fallback', windows=False, page=1, total_pages=0)
+        else:
+            vals.update(
+                windows=windows,
+                page=1 + sum(window['next'] - 1 for window in windows),
+                total_pages=sum(window['pages'] for window in windows),
+            )
+        vals['attempts'] = 0
+        self.write(vals)
+
+    def _transform_staged(self):
+        """Transforma las páginas en staging del job y acumula sus contadores."""
+        new_reports, new_expenses, failed = self._get_staged_pages()._transform()
+        vals = {
+            'reports_created': self.reports_created + len(new_reports),
+            'expenses_created': self.expenses_created + len(new_expenses),
+        }
+        if failed:
+            vals.update(pages_failed=self.pages_failed + len(failed), last_error=failed[-1].last_error)
+        self.write(vals)
+
+    def _finish(self):
+        """Marca el job como terminado y avanza la marca de agua en la misma transacción."""
+        self.ensure_one()
+        journal = self.journal_id
+        last_sync = journal.rindegastos_last_sync
+        # Los jobs de la tarea programada parten de la marca de agua o de la carga inicial del diario
+        if self.trigger == 'cron' or not self.since or (last_sync and self.since <= last_sync):
+            journal._advance_rindegastos_watermark(self.until)
+        # Con páginas fallidas se conserva el error para revisarlas en el staging
+        self.write({'state': 'done', 'last_error': self.last_error if self.pages_failed else False})
+        self._notify_user('Importación de Rindegastos terminada', 'warning' if self.pages_failed else 'success')
+
+    def _record_failure(self, error, max_attempts):
+        """Registra el error; el job se reintenta desde su checkpoint hasta agotar los intentos."""
+        self.ensure_one()
+        attempts = self.attempts + 1
+        _logger.warning(f"Error en la sincronización de Rindegastos del diario {self.journal_id.name} (intento {attempts}): {error}")
+        self.write({'attempts': attempts, 'last_error': str(error)})
+        if attempts >= max_attempts or isinstance(error, UserError):
+            self._fail(error)
+
+    def _fail(self, error):
+        self.write({'state': 'failed', 'last_error': str(error)})
+        self._notify_user('Importación de Rindegastos fallida', 'danger')
+
+    @api.autovacuum
+    def _gc_finished_jobs(self):
+        """Elimina los jobs terminados, fallidos o cancelados con más de 30 días."""
+        limit_date = fields.Datetime.now() - timedelta(days=30)
+        self.search([('state', 'in', ('done', 'failed', 'cancelled')), ('write_date', '<', limit_date)]).unlink()
@@ -0,0 +1,112 @@
+from odoo import models, fields, api
+from odoo.addons.rindegastos_userid.tools.sync_stats import SyncStats, collect_stats
+from contextlib import contextmanager
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosSyncMetricsMixin(models.AbstractModel):
+    _name = 'rindegastos.sync.metrics.mixin'
+    _description = 'Métricas de sincronización de Rindegastos'
+
+    pages_fetched = fields.Integer(string='Páginas Descargadas')
+    latency_p50 = fields.Float(string='Latencia p50 (ms)', group_operator='avg')
+    latency_p95 = fields.Float(string='Latencia p95 (ms)', group_operator='avg')
+    latency_p99 = fields.Float(string='Latencia p99 (ms)', group_operator='max')
+    retries = fields.Integer(string='Reintentos')
+    bytes_transferred = fields.Float(string='Bytes Transferidos', digits=(16, 0))
+    records_created = fields.Integer(string='Registros Creados')
+    records_updated = fields.Integer(string='Registros Actualizados', help='Registros existentes cuyo contenido cambió en Rindegastos')
+    duplicates_skipped = fields.Integer(string='Duplicados Omitidos')
+    records_rejected = fields.Integer(string='Rechazados por Campos Faltantes')
+    query_count = fields.Integer(string='Consultas SQL')
+    fetch_seconds = fields.Float(string='Descarga (s)', help='Tiempo acumulado de los hilos que descargan páginas')
+    parse_seconds = fields.Float(string='Transformación (s)')
+    dedup_seconds = fields.Float(string='Deduplicación (s)')
+    create_seconds = fields.Float(string='Creación (s)')
+    statement_seconds = fields.Float(string='Líneas de Extracto (s)')
+
+    @api.model
+    def _prepare_metrics_vals(self, stats):
+        return {
+            'pages_fetched': len(stats.latencies),
+            'latency_p50': stats.percentile(50) * 1000,
+            'latency_p95': stats.percentile(95) * 1000,
+            'latency_p99': stats.percentile(99) * 1000,
+            'retries': stats.retries,
+            'bytes_transferred': stats.bytes,
+            'records_created': stats.counters['created'],
+            'records_updated': stats.counters['updated'],
+            'duplicates_skipped': stats.counters['duplicates'],
+            'records_rejected': stats.counters['rejected'],
+            'query_count': sum(stats.phase_queries.values()),
+            **{f'{phase}_seconds': seconds for phase, seconds in stats.phase_seconds.items()},
+        }
+
+
+class RindegastosSyncRun(models.Model):
+    _name = 'rindegastos.sync.run'
+    _inherit = ['rindegastos.sync.metrics.mixin']
+    _description = 'Ejecución de sincronización de Rindegastos'
+    _order = 'start_date desc, id desc'
+    _rec_name = 'start_date'
+
+    trigger = fields.Selection([('cron', 'Tarea Programada'), ('wizard', 'Asistente'), ('webhook', 'Notificación')], string='Origen', required=True)
+    start_date = fields.Datetime(string='Inicio', required=True)
+    duration = fields.Float(string='Duración (s)')
+    state = fields.Selection([('done', 'Terminada'), ('failed', 'Fallida')], string='Estado', required=True)
+    error = fields.Text(string='Error')
+    company_id = fields.Many2one('res.company', string='Compañía')
+    line_ids = fields.One2many('rindegastos.sync.run.line', 'run_id', string='Diarios')
+
+    @contextmanager
+    def _track(self, trigger):
+        """Registra con un cursor propio las métricas de la sincronización ejecutada dentro del bloque."""
+        stats = SyncStats()
+        start_date = fields.Datetime.now()
+        start = time.perf_counter()
+        queries = self.env.cr.sql_log_count
+        error = None
+        with collect_stats(stats):
+            try:
+                yield stats
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                self._store_run(trigger, stats, start_date, time.perf_counter() - start, self.env.cr.sql_log_count - queries, error)
+
+    def _store_run(self, trigger, stats, start_date, duration, query_count, error):
+        vals = dict(
+            self._prepare_metrics_vals(stats),
+            trigger=trigger,
+            start_date=start_date,
+            duration=duration,
+            query_count=query_count,
+            state='failed' if error else 'done',
+            error=str(error) if error else False,
+            company_id=self.env.company.id,
+            line_ids=[
+                (0, 0, dict(self.env['rindegastos.sync.run.line']._prepare_metrics_vals(child), journal_id=journal_id))
+                for journal_id, child in stats.children.items()
+            ],
+        )
+        try:
+            with self.env.registry.cursor() as cr:
+                self.env(cr=cr)['rindegastos.sync.run'].sudo().create(vals)
+        except Exception:
+            _logger.exception("No se pudo guardar la ejecución de sincronización de Rindegastos")
+
+
+class RindegastosSyncRunLine(models.Model):
+    _name = 'rindegastos.sync.run.line'
+    _inherit = ['rindegastos.sync.metrics.mixin']
+    _description = 'Métricas por diario de una sincronización de Rindegastos'
+    _order = 'run_id desc, id'
+
+    run_id = fields.Many2one('rindegastos.sync.run', string='Ejecución', required=True, ondelete='cascade', index=True)
+    start_date = fields.Datetime(related='run_id.start_date', store=True)
+    journal_id = fields.Many2one('account.journal', string='Diario Contable', ondelete='cascade')
+    employee_id = fields.Many2one('hr.employee', related='journal_id.employee_id', store=True, string='Empleado')
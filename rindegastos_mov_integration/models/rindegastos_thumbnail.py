@@ -0,0 +1,115 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.addons.rindegastos_userid.tools.common import FILE_HOSTS, RindegastosApiError, run_concurrently
+from odoo.tools.image import image_process
+from datetime import timedelta
+from markupsafe import escape
+import base64
+import hashlib
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class RindegastosThumbnail(models.Model):
+    _name = 'rindegastos.thumbnail'
+    _description = 'Miniatura local de un archivo de Rindegastos'
+    _rec_name = 'url'
+
+    url = fields.Char(string='URL', required=True)
+    url_hash = fields.Char(string='Hash de la URL', required=True, index=True)
+    image = fields.Image(string='Miniatura', max_width=256, max_height=256, attachment=True)
+    image_size = fields.Integer(string='Tamaño (bytes)')
+    state = fields.Selection([('done', 'Disponible'), ('failed', 'No disponible')], string='Estado', required=True, default='done')
+
+    _sql_constraints = [
+        ('url_hash_uniq', 'unique(url_hash)', 'Ya existe una miniatura para esta URL.'),
+    ]
+
+    @api.model
+    def _hash_url(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    @api.model
+    def _get_by_urls(self, urls):
+        """Devuelve {url: miniatura disponible} para las URLs con una sola consulta."""
+        hashes = {self._hash_url(url): url for url in urls if url}
+        if not hashes:
+            return {}
+        thumbnails = self.sudo().search([('url_hash', 'in', list(hashes)), ('state', '=', 'done')])
+        return {hashes[thumbnail.url_hash]: thumbnail for thumbnail in thumbnails}
+
+    @api.model
+    def _render_previews(self, urls):
+        """HTML de vista previa por URL: la miniatura local si existe, si no solo el enlace."""
+        thumbnails = self._get_by_urls(urls)
+        previews = {}
+        for url in set(urls):
+            if not url:
+                previews[url] = ''
+                continue
+            thumbnail = thumbnails.get(url)
+            if thumbnail:
+                previews[url] = f'<a href="{escape(url)}" target="_blank"><img src="/web/image/rindegastos.thumbnail/{thumbnail.id}/image" style="max-width: 300px; max-height: 300px;" alt="Vista previa del archivo" loading="lazy"/></a>'
+            else:
+                previews[url] = f'<a href="{escape(url)}" target="_blank">Ver archivo</a>'
+        return previews
+
+    @api.model
+    def _get_missing_urls(self, max_age, limit):
+        """URLs de archivos de registros recientes que aún no tienen miniatura (ni fallo registrado)."""
+        since = fields.Datetime.now() - max_age
+        urls = set()
+        for model, field in (('rindegastos.expense', 'file_url'), ('rindegastos.report', 'file_url'), ('account.bank.statement.line', 'rindegastos_file_url')):
+            for record in self.env[model].sudo().search_read([(field, '!=', False), ('create_date', '>=', since)], [field], order='id desc', limit=limit):
+                urls.add(record[field])
+        known = {thumbnail.url_hash for thumbnail in self.sudo().search([('url_hash', 'in', [self._hash_url(url) for url in urls])])}
+        return [url for url in urls if self._hash_url(url) not in known][:limit]
+
+    @api.model
+    def _make_thumbnail(self, url, allowed_hosts=FILE_HOSTS):
+        """Descarga y reduce la imagen a 256x256; None si no es una imagen válida o la URL no está permitida."""
+        from odoo.addons.rindegastos_userid.tools.rindegastos_api import download_file
+        try:
+            return image_process(download_file(url, allowed_hosts=allowed_hosts), size=(256, 256))
+        except (RindegastosApiError, UserError, ValueError, OSError) as e:
+            # image_process levanta UserError con archivos que no son imágenes (p. ej. PDF)
+            _logger.info(f"No se pudo generar la miniatura de {url}: {e}")
+            return None
+
+    @api.model
+    def cron_fill_thumbnails(self):
+        """Descarga en paralelo las miniaturas faltantes y aplica la política de expiración por antigüedad y tamaño."""
+        params = self.env['ir.config_parameter'].sudo()
+        max_age = timedelta(days=int(params.get_param('rindegastos.thumbnail_max_age_days', 90)))
+        batch_size = int(params.get_param('rindegastos.thumbnail_batch_size', 200))
+        max_workers = int(params.get_param('rindegastos.fetch_workers', 4))
+        file_hosts = params.get_param('rindegastos.file_hosts')
+        allowed_hosts = tuple(host.strip().lower() for host in file_hosts.split(',') if host.strip()) if file_hosts else FILE_HOSTS
+
+        urls = self._get_missing_urls(max_age, batch_size)
+        images = run_concurrently(lambda url: self._make_thumbnail(url, allowed_hosts), urls, max_workers)
+        self.sudo().create([{
+            'url': url,
+            'url_hash': self._hash_url(url),
+            'image': base64.b64encode(image) if image else False,
+            'image_size': len(image) if image else 0,
+            'state': 'done' if image else 'failed',
+        } for url, image in zip(urls, images)])
+        self._evict_thumbnails(max_age, int(params.get_param('rindegastos.thumbnail_max_mb', 200)) * 1024 * 1024)
+
+    @api.model
+    def _evict_thumbnails(self, max_age, max_bytes):
+        thumbnails = self.sudo()
+        thumbnails.search([('create_date', '<', fields.Datetime.now() - max_age)]).unlink()
+        total = sum(group['image_size'] for group in thumbnails.read_group([], ['image_size:sum'], []))
+        if total <= max_bytes:
+            return
+        # Se eliminan las más antiguas hasta quedar bajo el límite
+        to_unlink = thumbnails.browse()
+        for thumbnail in thumbnails.search([('state', '=', 'done')], order='create_date, id'):
+            if total <= max_bytes:
+                break
+            total -= thumbnail.image_size
+            to_unlink |= thumbnail
+        to_unlink.unlink()
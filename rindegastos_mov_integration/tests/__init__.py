@@ -0,0 +1,2 @@
+from . import test_rindegastos_api
+from . import test_rindegastos_upsert
@@ -0,0 +1,174 @@
+"""Pruebas del cliente HTTP (reintentos, circuito y ventanas) contra la API simulada; no usan el ORM."""
+import threading
+from datetime import date, timedelta
+
+from odoo.addons.rindegastos_userid.tools.common import CircuitOpenError, RindegastosApiError
+from odoo.addons.rindegastos_userid.tools.rindegastos_api import RindegastosClient, _CircuitBreaker, check_file_url, download_file
+from odoo.tests import BaseCase, tagged
+
+from ..tools.mock_api import MockRindegastosServer, generate_dataset
+
+
+def _client(server, **options):
+    options = dict({'requests_per_second': 0, 'backoff_factor': 0.001, 'max_backoff': 0.01}, **options)
+    return RindegastosClient('test-token', base_url=server.base_url, **options)
+
+
+@tagged('post_install', '-at_install')
+class TestRindegastosClientRetries(BaseCase):
+
+    def test_throttled_pages_are_retried(self):
+        dataset = generate_dataset(employees=1, reports=100, expenses=5, seed=7)
+        with MockRindegastosServer(dataset, throttle_rate=0.7, seed=7) as server:
+            client = _client(server, max_retries=40, max_workers=4)
+            payloads = client.get_all_pages('getExpenses', {'UserId': 1, 'ResultsPerPage': 50})
+            self.assertEqual(client.circuit_state, 'closed')
+        ids = [expense['Id'] for payload in payloads for expense in payload['Expenses']]
+        self.assertEqual(sorted(ids), [expense['Id'] for expense in dataset['expenses']])
+
+    def test_truncated_responses_are_retried(self):
+        with MockRindegastosServer(truncate_rate=0.5, seed=5) as server:
+            client = _client(server, max_retries=30)
+            self.assertEqual(client.get('getUser', {'Email': 'empleado1@example.com'}), {'Id': 1})
+
+    def test_truncated_responses_exhausted(self):
+        with MockRindegastosServer(truncate_rate=1.0) as server:
+            client = _client(server, max_retries=2)
+            with self.assertRaises(RindegastosApiError):
+                client.get('getUser', {'Email': 'empleado1@example.com'})
+            self.assertEqual(server.calls['getUser'], 3)
+
+    def test_retries_exhausted(self):
+        with MockRindegastosServer(error_rate=1.0) as server:
+            client = _client(server, max_retries=2)
+            with self.assertRaises(RindegastosApiError):
+                client.get('getUser', {'Email': 'empleado1@example.com'})
+            self.assertEqual(server.calls['getUser'], 3)
+
+
+@tagged('post_install', '-at_install')
+class TestRindegastosCircuitBreaker(BaseCase):
+
+    def test_throttling_does_not_open_circuit(self):
+        with MockRindegastosServer(throttle_rate=1.0) as server:
+            client = _client(server, max_retries=1)
+            for _attempt in range(client.circuit.failure_threshold + 1):
+                with self.assertRaises(RindegastosApiError) as error:
+                    client.get('getUser', {'Email': 'empleado1@example.com'})
+                self.assertNotIsInstance(error.exception, CircuitOpenError)
+            self.assertEqual(client.circuit_state, 'closed')
+
+    def test_failures_count_once_per_request(self):
+        with MockRindegastosServer(error_rate=1.0) as server:
+            client = _client(server, max_retries=3)
+            threshold = client.circuit.failure_threshold
+            for _attempt in range(threshold - 1):
+                with self.assertRaises(RindegastosApiError):
+                    client.get('getUser', {})
+            # 4 solicitudes con 4 intentos cada una: aún bajo el umbral
+            self.assertEqual(client.circuit_state, 'closed')
+            with self.assertRaises(RindegastosApiError):
+                client.get('getUser', {})
+            self.assertEqual(client.circuit_state, 'open')
+            calls = server.calls['getUser']
+            with self.assertRaises(CircuitOpenError):
+                client.get('getUser', {})
+            self.assertEqual(server.calls['getUser'], calls, "Con el circuito abierto no se envían solicitudes")
+
+    def test_half_open_allows_single_probe(self):
+        circuit = _CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        circuit.record_failure()
+        self.assertEqual(circuit.state, 'half_open')
+        circuit.before_request()  # Este hilo toma la prueba
+        errors = []
+
+        def other_request():
+            try:
+                circuit.before_request()
+            except CircuitOpenError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        circuit.before_request()  # Los reintentos de la prueba siguen pasando
+        circuit.record_success()
+        self.assertEqual(circuit.state, 'closed')
+
+    def test_half_open_probe_released(self):
+        circuit = _CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        circuit.record_failure()
+        circuit.before_request()
+        circuit.release()  # La prueba terminó sin éxito ni fallo contable (p. ej. un 404)
+        errors = []
+
+        def other_request():
+            try:
+                circuit.before_request()
+            except CircuitOpenError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        thread.join()
+        self.assertFalse(errors, "Otro hilo puede tomar la prueba liberada")
+
+
+@tagged('post_install', '-at_install')
+class TestRindegastosWindows(BaseCase):
+
+    def test_plan_windows_splits_dense_ranges(self):
+        start = date(2024, 1, 1)
+        dataset = generate_dataset(employees=1, reports=200, expenses=5, start=start, days=365, seed=3)
+        params = {'UserId': 1, 'Since': start.isoformat(), 'Until': (start + timedelta(days=400)).isoformat()}
+        with MockRindegastosServer(dataset) as server:
+            client = _client(server, window_records=150, max_workers=4)
+            plan = client.plan_windows('getExpenses', params)
+            payloads = client.get_all_pages('getExpenses', params)
+
+        self.assertGreater(len(plan), 1)
+        previous_until = None
+        for window, pages in plan:
+            since, until = date.fromisoformat(window['Since']), date.fromisoformat(window['Until'])
+            records = sum(1 for e in dataset['expenses'] if window['Since'] <= e['IssueDate'] <= window['Until'])
+            self.assertTrue(records <= client.window_records or since == until)
+            self.assertEqual(pages, -(-records // window['ResultsPerPage']))
+            if previous_until:
+                self.assertGreater(since, previous_until, "Las ventanas no se solapan")
+            previous_until = until
+        ids = [expense['Id'] for payload in payloads for expense in payload['Expenses']]
+        self.assertEqual(sorted(ids), sorted(e['Id'] for e in dataset['expenses'] if e['IssueDate'] >= params['Since']))
+
+    def test_plan_windows_empty_range(self):
+        with MockRindegastosServer(generate_dataset(employees=1, reports=1, expenses=1, start=date(2024, 1, 1), days=10)) as server:
+            client = _client(server)
+            self.assertEqual(client.plan_windows('getExpenses', {'UserId': 1, 'Since': '2020-01-01', 'Until': '2020-12-31'}), [])
+
+
+@tagged('post_install', '-at_install')
+class TestRindegastosFileUrls(BaseCase):
+
+    def test_allowed_file_urls(self):
+        check_file_url('https://rindegastos.com/files/boleta.jpg')
+        check_file_url('https://archivos.rindegastos.com:443/files/boleta.jpg')
+
+    def test_rejected_file_urls(self):
+        for url in (
+            'http://archivos.rindegastos.com/boleta.jpg',
+            'https://169.254.169.254/latest/meta-data/',
+            'https://rindegastos.com.example.org/boleta.jpg',
+            'https://evilrindegastos.com/boleta.jpg',
+            'https://usuario@archivos.rindegastos.com/boleta.jpg',
+            'https://archivos.rindegastos.com:8443/boleta.jpg',
+            'file:///etc/passwd',
+            '',
+        ):
+            with self.subTest(url=url), self.assertRaises(RindegastosApiError):
+                check_file_url(url)
+
+    def test_download_rejects_before_connecting(self):
+        with MockRindegastosServer() as server:
+            with self.assertRaises(RindegastosApiError):
+                download_file(f'{server.base_url}/boleta.jpg', allowed_hosts=('127.0.0.1',))
+            self.assertFalse(sum(server.calls.values()))
@@ -0,0 +1,137 @@
+"""Pruebas del upsert de reports y expenses, del archivo compactado y de la normalización de RUT."""
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.addons.rindegastos_userid.tools.sync_stats import SyncStats, collect_stats
+from odoo.tests import tagged
+
+from ..models.res_partner import RUT_NORMALIZE_SQL
+
+
+def _report(report_id, total=3000):
+    return {
+        'Id': report_id, 'SendDate': '2024-03-05', 'ReportTotal': total, 'ReportTotalApproved': total,
+        'Title': 'Viaje', 'ReportNumber': str(report_id),
+    }
+
+
+def _expense(expense_id, total=1500, report_id=501, rut=None):
+    extra_fields = [{'Name': 'Numero de Documento', 'Value': str(expense_id)}]
+    if rut:
+        extra_fields += [{'Name': 'Tipo de Documento', 'Value': 'Factura Afecta'}, {'Name': 'Rut Proveedor', 'Value': rut}]
+    return {
+        'Id': expense_id, 'IssueDate': '2024-03-01', 'Total': total, 'ReportId': report_id,
+        'Category': 'Comida', 'Supplier': 'Proveedor', 'ExtraFields': extra_fields,
+    }
+
+
+@tagged('post_install', '-at_install')
+class TestRindegastosUpsert(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.journal = cls.company_data['default_journal_bank']
+        cls.other_journal = cls.env['account.journal'].create({'name': 'Rindegastos 2', 'type': 'bank', 'code': 'RGT2'})
+        cls.report_model = cls.env['rindegastos.report']
+        cls.expense_model = cls.env['rindegastos.expense']
+
+    def _import_expenses(self, transactions, journal=None):
+        stats = SyncStats()
+        with collect_stats(stats):
+            expenses = self.expense_model._create_expenses_from_page(journal or self.journal, transactions)
+        return expenses, stats.counters
+
+    def _find_expense(self, expense_id, journal=None):
+        return self.expense_model.search([('journal_id', '=', (journal or self.journal).id), ('name', '=', str(expense_id))])
+
+    def test_upsert_keyed_by_id_and_journal(self):
+        first = self.report_model._create_reports_from_page(self.journal, [_report(501)])
+        other = self.report_model._create_reports_from_page(self.other_journal, [_report(501)])
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(other), 1, "El mismo Id en otro diario es otro registro")
+        self.assertFalse(self.report_model._create_reports_from_page(self.journal, [_report(501)]))
+
+        self.report_model._create_reports_from_page(self.journal, [_report(501, total=4000)])
+        self.assertEqual(first.amount, 4000)
+        self.assertEqual(other.amount, 3000)
+        self.assertEqual(self.report_model.search_count([('name', '=', '501')]), 2)
+
+    def test_link_only_update(self):
+        _expenses, counters = self._import_expenses([_expense(1001)])
+        expense = self._find_expense(1001)
+        self.assertFalse(expense.report_id, "El report aún no está importado")
+        content_hash = expense.content_hash
+
+        report = self.report_model._create_reports_from_page(self.journal, [_report(501)])
+        created, counters = self._import_expenses([_expense(1001)])
+        self.assertFalse(created)
+        self.assertEqual(counters['updated'], 1)
+        self.assertEqual(expense.report_id, report)
+        self.assertEqual(expense.content_hash, content_hash, "El enlace no forma parte del hash del payload")
+
+    def test_empty_link_does_not_clear_stored_link(self):
+        partner = self.env['res.partner'].create({'name': 'Proveedor', 'vat': '76.086.428-5'})
+        self._import_expenses([_expense(1002, rut='76086428-5')])
+        expense = self._find_expense(1002)
+        self.assertEqual(expense.partner_id, partner)
+
+        # El RUT ya no resuelve a ningún contacto: el enlace guardado se conserva
+        partner.vat = '11.111.111-1'
+        _created, counters = self._import_expenses([_expense(1002, rut='76086428-5')])
+        self.assertEqual(expense.partner_id, partner)
+        self.assertEqual(counters['updated'], 0)
+        self.assertEqual(counters['duplicates'], 1)
+
+    def test_changes_propagate_to_unreconciled_statement_lines(self):
+        self._import_expenses([_expense(1003), _expense(1004)])
+        reconciled_expense, open_expense = self._find_expense(1003), self._find_expense(1004)
+        (reconciled_expense | open_expense).create_account_move()
+        reconciled_line = reconciled_expense.move_id.statement_line_id
+        open_line = open_expense.move_id.statement_line_id
+        self.assertTrue(reconciled_line and open_line)
+
+        suspense_line = reconciled_line.move_id.line_ids.filtered(lambda l: l.account_id == self.journal.suspense_account_id)
+        suspense_line.account_id = self.company_data['default_account_expense']
+        self.assertTrue(reconciled_line.is_reconciled)
+
+        self._import_expenses([_expense(1003, total=2000), _expense(1004, total=2000)])
+        self.assertEqual(reconciled_expense.amount, -2000)
+        self.assertEqual(open_expense.amount, -2000)
+        self.assertEqual(open_line.amount, -2000)
+        self.assertEqual(reconciled_line.amount, -1500, "Una línea conciliada no se modifica")
+
+    def test_archived_expenses_are_not_imported_again(self):
+        self._import_expenses([_expense(1005)])
+        self.env['rindegastos.archive']._compact(self._find_expense(1005))
+        self.assertFalse(self._find_expense(1005))
+
+        created, counters = self._import_expenses([_expense(1005)])
+        self.assertFalse(created)
+        self.assertEqual(counters['duplicates'], 1, "Un Id archivado se cuenta una sola vez")
+
+        created, _counters = self._import_expenses([_expense(1005)], journal=self.other_journal)
+        self.assertEqual(len(created), 1, "El archivo es por diario")
+
+    def test_compact_skips_already_archived(self):
+        self._import_expenses([_expense(1006)])
+        self.env['rindegastos.archive']._compact(self._find_expense(1006))
+        self._import_expenses([_expense(1006)], journal=self.other_journal)
+        archive = self.env['rindegastos.archive']
+        archive.create({'res_model': 'rindegastos.expense', 'journal_id': self.other_journal.id, 'name': '1006'})
+        archive._compact(self._find_expense(1006, journal=self.other_journal))
+        self.assertEqual(archive.search_count([('name', '=', '1006'), ('res_model', '=', 'rindegastos.expense')]), 2)
+
+
+@tagged('post_install', '-at_install')
+class TestRindegastosRutNormalization(AccountTestInvoicingCommon):
+
+    def test_python_and_sql_normalization_match(self):
+        partner_model = self.env['res.partner']
+        for rut in ('12.345.678-9', 'CL123456789', 'cl 12.345.678-k', ' CL 7.654.321-0', '0012345678K', '76086428-5', '', '---', '000', None):
+            with self.subTest(rut=rut):
+                self.env.cr.execute(f"SELECT {RUT_NORMALIZE_SQL.format('%s')}", [rut])
+                self.assertEqual(self.env.cr.fetchone()[0] or False, partner_model._normalize_rindegastos_rut(rut))
+
+    def test_partner_lookup_by_rut(self):
+        parent = self.env['res.partner'].create({'name': 'Proveedor', 'vat': 'CL76086428-5'})
+        self.env['res.partner'].create({'name': 'Contacto', 'vat': '76.086.428-5', 'parent_id': parent.id})
+        self.assertEqual(self.env['res.partner']._get_partners_by_rut(['76086428-5']), {'760864285': parent.id})
@@ -0,0 +1,4 @@
+from . import mock_api
+from . import benchmark
+from . import webhook_sender
+from . import startup_benchmark
@@ -0,0 +1,124 @@
+"""Benchmark reproducible de la importación de Rindegastos contra la API simulada.
+
+Mide ``fetch_and_create_reports``, ``fetch_and_create_expenses`` y ``create_account_move``
+reportando tiempo, consultas SQL, llamadas HTTP y memoria máxima por cada 1.000 registros.
+Se ejecuta desde un shell de Odoo sobre una base desechable; todo se revierte al terminar::
+
+    odoo-bin shell -d bench_db
+    >>> from odoo.addons.rindegastos_mov_integration.tools.benchmark import run_benchmark
+    >>> run_benchmark(env, employees=20, reports=50, expenses=5)
+"""
+import logging
+import time
+import tracemalloc
+
+from .mock_api import MockRindegastosServer, generate_dataset
+
+_logger = logging.getLogger(__name__)
+
+
+class _Measure:
+    """Context manager que acumula tiempo, consultas, llamadas HTTP y memoria de una fase."""
+
+    def __init__(self, env, server, name):
+        self.env = env
+        self.server = server
+        self.name = name
+        self.result = {'phase': name}
+
+    def __enter__(self):
+        self.env.flush_all()
+        self.queries = self.env.cr.sql_log_count
+        self.calls = sum(self.server.calls.values())
+        tracemalloc.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.env.flush_all()
+        elapsed = time.perf_counter() - self.start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.result.update({
+            'seconds': elapsed,
+            'queries': self.env.cr.sql_log_count - self.queries,
+            'http_calls': sum(self.server.calls.values()) - self.calls,
+            'peak_memory_kb': peak / 1024,
+        })
+
+    def set_records(self, count):
+        self.result['records'] = count
+        per_thousand = 1000.0 / count if count else 0.0
+        for key in ('seconds', 'queries', 'http_calls', 'peak_memory_kb'):
+            self.result[f'{key}_per_1000'] = self.result[key] * per_thousand
+
+
+def _create_journals(env, dataset, user_ids, prefix):
+    """Crea un empleado y un diario bancario Rindegastos por cada UserId del dataset."""
+    emails = {user_id: email for email, user_id in dataset['users'].items()}
+    journals = env['account.journal']
+    for user_id in user_ids:
+        employee = env['hr.employee'].create({
+            'name': f'Benchmark {prefix} {user_id}',
+            'work_email': emails[user_id],
+            'rindegastos_userid': str(user_id),
+        })
+        journals |= env['account.journal'].create({
+            'name': f'Rindegastos {prefix} {user_id}',
+            'code': f'{prefix[:1]}{user_id:04d}',
+            'type': 'bank',
+            'bank_statements_source': 'rindegastos',
+            'employee_id': employee.id,
+        })
+    return journals
+
+
+def run_benchmark(env, employees=10, reports=20, expenses=5, latency=0.0, error_rate=0.0, throttle_rate=0.0, seed=42):
+    """Ejecuta el benchmark y devuelve una fila de métricas por fase; al terminar revierte la transacción.
+
+    La mitad de los empleados se usa para ``fetch_and_create_reports`` (importación completa)
+    y la otra mitad para ``fetch_and_create_expenses`` seguido de ``create_account_move``.
+    """
+    dataset = generate_dataset(employees * 2, reports, expenses, seed=seed)
+    params = env['ir.config_parameter'].sudo()
+    company = env.company
+    results = []
+    with MockRindegastosServer(dataset, latency=latency, error_rate=error_rate, throttle_rate=throttle_rate, seed=seed) as server:
+        try:
+            params.set_param('rindegastos.api_url', server.base_url)
+            company.rindegastos_tokenid = company.rindegastos_tokenid or 'benchmark-token'
+            report_journals = _create_journals(env, dataset, range(1, employees + 1), 'R')
+            expense_journals = _create_journals(env, dataset, range(employees + 1, employees * 2 + 1), 'E')
+            report_model = env['rindegastos.report']
+            expense_model = env['rindegastos.expense']
+
+            with _Measure(env, server, 'fetch_and_create_reports') as measure:
+                report_model.fetch_and_create_reports(journal_id=report_journals)
+            measure.set_records(
+                report_model.search_count([('journal_id', 'in', report_journals.ids)])
+                + expense_model.search_count([('journal_id', 'in', report_journals.ids)])
+            )
+            results.append(measure.result)
+
+            with _Measure(env, server, 'fetch_and_create_expenses') as measure:
+                new_expenses = expense_model.fetch_and_create_expenses(journal_id=expense_journals)
+            measure.set_records(len(new_expenses))
+            results.append(measure.result)
+
+            with _Measure(env, server, 'create_account_move') as measure:
+                new_expenses.create_account_move()
+            measure.set_records(len(new_expenses))
+            results.append(measure.result)
+        finally:
+            env.cr.rollback()
+            env.invalidate_all()
+
+    header = f"{'fase':<28}{'registros':>10}{'s/1000':>10}{'SQL/1000':>10}{'HTTP/1000':>11}{'KB/1000':>10}"
+    lines = [header] + [
+        f"{r['phase']:<28}{r.get('records', 0):>10}{r.get('seconds_per_1000', 0):>10.2f}{r.get('queries_per_1000', 0):>10.0f}"
+        f"{r.get('http_calls_per_1000', 0):>11.1f}{r.get('peak_memory_kb_per_1000', 0):>10.0f}"
+        for r in results
+    ]
+    _logger.info("Benchmark de importación Rindegastos:\n%s", '\n'.join(lines))
+    print('\n'.join(lines))
+    return results
@@ -0,0 +1,224 @@
+"""Servidor local que imita la API de Rindegastos para medir la importación sin tocar api.rindegastos.com.
+
+Implementa getUser, getExpenses, getExpenseReports y getExpenseReport con paginación (Page, ResultsPerPage,
+Records.Pages) sobre un dataset sintético de N empleados, M reports por empleado y K expenses
+por report, con latencia configurable e inyección de fallos 429/5xx y de respuestas truncadas.
+
+Uso independiente::
+
+    python rindegastos_mov_integration/tools/mock_api.py --employees 50 --reports 20 --expenses 5 --latency 0.05
+
+y luego apuntar el parámetro del sistema ``rindegastos.api_url`` a ``http://127.0.0.1:<puerto>/v1``.
+``GET /__stats`` devuelve las llamadas recibidas por endpoint y ``GET /__reset`` las reinicia.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DOCUMENT_TYPES = ['Factura Afecta', 'Factura Exenta', 'Honorarios', 'Boleta']
+MAX_RESULTS_PER_PAGE = 500
+
+
+def generate_dataset(employees=10, reports=10, expenses=5, start=None, days=365, seed=42):
+    """Genera empleados, reports y expenses sintéticos y deterministas."""
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days)
+    users, report_rows, expense_rows = {}, [], []
+    expense_id = 1
+    for user_id in range(1, employees + 1):
+        users[f'empleado{user_id}@example.com'] = user_id
+        for _report in range(reports):
+            report_id = len(report_rows) + 1
+            send_date = start + timedelta(days=rng.randrange(days))
+            report_expenses = []
+            for _expense in range(expenses):
+                total = rng.randrange(1000, 200000)
+                document_type = rng.choice(DOCUMENT_TYPES)
+                report_expenses.append({
+                    'Id': expense_id,
+                    'UserId': user_id,
+                    'ReportId': report_id,
+                    'IssueDate': (send_date - timedelta(days=rng.randrange(30))).isoformat(),
+                    'Total': total,
+                    'Category': rng.choice(['Alimentación', 'Transporte', 'Alojamiento', 'Materiales']),
+                    'Supplier': f'Proveedor {rng.randrange(1, 500)}',
+                    'ExtraFields': [
+                        {'Name': 'Tipo de Documento', 'Value': document_type},
+                        {'Name': 'Numero de Documento', 'Value': str(rng.randrange(1, 10 ** 6))},
+                        {'Name': 'Rut Proveedor', 'Value': f'{rng.randrange(1, 30) * 10 ** 6 + rng.randrange(10 ** 6)}-{rng.choice("0123456789K")}'},
+                    ],
+                    'Files': [{'Large': f'https://files.example.com/expenses/{expense_id}.jpg'}],
+                })
+                expense_id += 1
+            total = sum(e['Total'] for e in report_expenses)
+            report_rows.append({
+                'Id': report_id,
+                'UserId': user_id,
+                'SendDate': send_date.isoformat(),
+                'ReportTotal': total,
+                'ReportTotalApproved': total - rng.choice([0, 0, 0, rng.randrange(0, 1000)]),
+                'ReportNumber': str(1000 + report_id),
+                'Title': f'Rendición {report_id}',
+                'Note': '',
+                'PolicyName': 'General',
+                'Files': [{'Large': f'https://files.example.com/reports/{report_id}.jpg'}],
+            })
+            expense_rows += report_expenses
+    return {'users': users, 'reports': report_rows, 'expenses': expense_rows}
+
+
+class MockRindegastosServer:
+    """Servidor HTTP en un hilo de fondo que sirve un dataset sintético."""
+
+    def __init__(self, dataset=None, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, throttle_rate=0.0, seed=42, truncate_rate=0.0):
+        self.dataset = dataset or generate_dataset(seed=seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.truncate_rate = truncate_rate
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _roll(self):
+        with self._lock:
+            return self._rng.random()
+
+    def _paginate(self, rows, query, key):
+        per_page = min(int(query.get('ResultsPerPage', 100)), MAX_RESULTS_PER_PAGE)
+        page = max(int(query.get('Page', 1)), 1)
+        pages = max((len(rows) + per_page - 1) // per_page, 1)
+        start = (page - 1) * per_page
+        return {
+            'Records': {'Start': start, 'Limit': per_page, 'Pages': pages, 'Results': len(rows)},
+            key: rows[start:start + per_page],
+        }
+
+    def _filter(self, rows, query, date_field):
+        if query.get('UserId'):
+            rows = [r for r in rows if str(r['UserId']) == query['UserId']]
+        if query.get('ReportId'):
+            rows = [r for r in rows if str(r.get('ReportId')) == query['ReportId']]
+        if query.get('Since'):
+            rows = [r for r in rows if r[date_field] >= query['Since']]
+        if query.get('Until'):
+            rows = [r for r in rows if r[date_field] <= query['Until']]
+        return rows
+
+    def handle(self, endpoint, query):
+        """Devuelve (status, headers, body) para una solicitud GET."""
+        if endpoint == '__stats':
+            return 200, {}, dict(self.calls)
+        if endpoint == '__reset':
+            self.calls.clear()
+            return 200, {}, {}
+        with self._lock:
+            self.calls[endpoint] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        roll = self._roll()
+        if roll < self.throttle_rate:
+            return 429, {'Retry-After': '0.1'}, {'Message': 'Too Many Requests'}
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, {}, {'Message': 'Service Unavailable'}
+
+        if endpoint == 'getUser':
+            return 200, {}, {'Id': self.dataset['users'].get(query.get('Email', '').lower(), 0)}
+        if endpoint == 'getExpenseReports':
+            rows = self._filter(self.dataset['reports'], query, 'SendDate')
+            return 200, {}, self._paginate(rows, query, 'ExpenseReports')
+        if endpoint == 'getExpenseReport':
+            report = next((r for r in self.dataset['reports'] if str(r['Id']) == query.get('Id')), None)
+            if report is None:
+                return 404, {}, {'Message': f"Report {query.get('Id')} no encontrado"}
+            return 200, {}, report
+        if endpoint == 'getExpenses':
+            rows = self._filter(self.dataset['expenses'], query, 'IssueDate')
+            return 200, {}, self._paginate(rows, query, 'Expenses')
+        return 404, {}, {'Message': f'Endpoint desconocido: {endpoint}'}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, headers, body = server.handle(url.path.rstrip('/').rsplit('/', 1)[-1], query)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if server.truncate_rate and not url.path.endswith(('__stats', '__reset')) and server._roll() < server.truncate_rate:
+                    # Corta el cuerpo antes del Content-Length anunciado y cierra la conexión
+                    self.wfile.write(payload[:len(payload) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--employees', type=int, default=10)
+    parser.add_argument('--reports', type=int, default=10, help='Reports por empleado')
+    parser.add_argument('--expenses', type=int, default=5, help='Expenses por report')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latencia por solicitud en segundos')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fracción de respuestas 429')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='Fracción de respuestas con el cuerpo truncado')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    dataset = generate_dataset(args.employees, args.reports, args.expenses, seed=args.seed)
+    server = MockRindegastosServer(dataset, args.host, args.port, args.latency, args.error_rate, args.throttle_rate, args.seed, args.truncate_rate)
+    print(f"API simulada de Rindegastos en {server.base_url} "
+          f"({len(dataset['users'])} empleados, {len(dataset['reports'])} reports, {len(dataset['expenses'])} expenses)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
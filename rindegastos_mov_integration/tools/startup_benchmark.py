@@ -0,0 +1,78 @@
+"""Mide el tiempo de carga del registro de Odoo con y sin los módulos de Rindegastos instalados.
+
+Cada muestra corre en un proceso nuevo, porque dentro de un mismo proceso los módulos de
+Python ya importados no vuelven a pagar su costo. Se comparan dos bases: una con los módulos
+instalados y otra sin ellos, y se informa además si la capa de servicio (``rindegastos_api``)
+quedó importada al terminar la carga; ``requests`` no se revisa porque otros módulos también
+lo importan::
+
+    python rindegastos_mov_integration/tools/startup_benchmark.py -c odoo.conf \\
+        --with-db con_rindegastos --without-db sin_rindegastos --samples 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_PROBE = '''
+import json, sys, time
+import odoo
+from odoo.tools import config
+config.parse_config(sys.argv[2:])
+start = time.perf_counter()
+odoo.modules.registry.Registry.new(sys.argv[1])
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'service_layer': 'odoo.addons.rindegastos_userid.tools.rindegastos_api' in sys.modules,
+}))
+'''
+
+
+def measure_registry_load(db_name, odoo_args=(), samples=5):
+    """Carga el registro de ``db_name`` en ``samples`` procesos nuevos y devuelve las mediciones."""
+    results = []
+    for _sample in range(samples):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE, db_name, *odoo_args],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def run_startup_benchmark(with_db, without_db, odoo_args=(), samples=5):
+    """Compara la carga del registro de ambas bases y devuelve una fila de resumen por base."""
+    rows = []
+    for label, db_name in (('con módulos', with_db), ('sin módulos', without_db)):
+        results = measure_registry_load(db_name, odoo_args, samples)
+        seconds = [r['seconds'] for r in results]
+        rows.append({
+            'label': label,
+            'db': db_name,
+            'median': statistics.median(seconds),
+            'min': min(seconds),
+            'max': max(seconds),
+            'service_layer': any(r['service_layer'] for r in results),
+        })
+    header = f"{'base':<14}{'mediana (s)':>12}{'mín (s)':>10}{'máx (s)':>10}{'servicio':>10}"
+    lines = [header] + [
+        f"{r['label']:<14}{r['median']:>12.3f}{r['min']:>10.3f}{r['max']:>10.3f}{'sí' if r['service_layer'] else 'no':>10}"
+        for r in rows
+    ]
+    lines.append(f"Diferencia de la mediana: {rows[0]['median'] - rows[1]['median']:+.3f} s")
+    print('\n'.join(lines))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--with-db', required=True, help='Base con los módulos de Rindegastos instalados')
+    parser.add_argument('--without-db', required=True, help='Base de referencia sin los módulos')
+    parser.add_argument('--samples', type=int, default=5, help='Procesos medidos por base')
+    args, odoo_args = parser.parse_known_args()
+    run_startup_benchmark(args.with_db, args.without_db, odoo_args, args.samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Emisor local de notificaciones que imita los webhooks de Rindegastos.
+
+Envía eventos de cambio de reports al endpoint ``/rindegastos/webhook`` con el secreto
+compartido, para probar la ingesta sin depender de Rindegastos::
+
+    python rindegastos_mov_integration/tools/webhook_sender.py --url http://localhost:8069/rindegastos/webhook \\
+        --secret mi-secreto --user-id 1 --report-id 3 --report-id 4
+
+Combinado con ``mock_api.py`` el worker descarga los reports notificados desde la API simulada.
+"""
+import argparse
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+
+def send_events(url, secret, events, timeout=10):
+    """Envía los eventos en una sola solicitud y devuelve (status, respuesta decodificada)."""
+    request = Request(
+        url,
+        data=json.dumps({'Events': events}).encode(),
+        headers={'Content-Type': 'application/json', 'X-Rindegastos-Secret': secret},
+        method='POST',
+    )
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b'{}')
+    except HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default='http://localhost:8069/rindegastos/webhook')
+    parser.add_argument('--secret', required=True)
+    parser.add_argument('--user-id', type=int, required=True)
+    parser.add_argument('--report-id', type=int, action='append', required=True)
+    parser.add_argument('--event', default='ExpenseReportUpdated')
+    args = parser.parse_args()
+    events = [{'Event': args.event, 'UserId': args.user_id, 'ReportId': report_id} for report_id in args.report_id]
+    status, body = send_events(args.url, args.secret, events)
+    print(f"{status}: {body}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,9 @@
     'author': 'Maatyer',
     'depends': ['hr'],  # Solo depende de hr
     'data': [
+        'security/ir.model.access.csv',
         'views/hr_employee_views.xml',
+        'data/cron.xml',
     ],
     'license': 'LGPL-3',
     'installable': True,
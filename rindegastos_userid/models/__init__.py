@@ -1,2 +1,3 @@
 from . import hr_employee
-from . import res_company
\ No newline at end of file
+from . import res_company
+from . import rindegastos_user_cache
\ No newline at end of file
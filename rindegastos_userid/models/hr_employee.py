@@ -1,6 +1,7 @@
 from odoo import models, fields, api
-import requests
 from odoo.exceptions import UserError
+from datetime import timedelta
+from ..tools.common import RindegastosApiError, run_concurrently
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -9,45 +10,120 @@ class HrEmployee(models.Model):
     _inherit = 'hr.employee'
 
     rindegastos_userid = fields.Char(string='Rindegastos User ID', help='ID del usuario en Rindegastos, importado por email')
+    rindegastos_userid_checked = fields.Datetime(string='User ID Consultado el', readonly=True, copy=False, help='Última vez que se consultó el User ID en Rindegastos')
 
     def action_import_rindegastos_userid(self):
-        """Importa el User ID de Rindegastos usando el email del empleado y actualiza el campo. Si no existe, deja en blanco."""
-        self.ensure_one()
-        if not self.work_email:
+        """Importa el User ID de Rindegastos usando el email de los empleados y actualiza el campo. Si no existe, deja en blanco."""
+        if len(self) == 1 and not self.work_email:
             raise UserError("El empleado no tiene un correo electrónico configurado (work_email).")
 
-        token = self.env.company.rindegastos_tokenid
-        if not token:
-            raise UserError("No se ha configurado un token de Rindegastos en la configuración de la compañía.")
+        stats = self._resolve_rindegastos_userids(force=self.env.context.get('rindegastos_force_lookup', False))
+        if len(self) == 1 and stats['without_token']:
+            raise UserError(f"No se ha configurado un token de Rindegastos para la compañía {(self.company_id or self.env.company).name}.")
+        if len(self) == 1 and stats['errors']:
+            raise UserError(f"Error al conectar con la API de Rindegastos: {stats['errors'][0]}")
 
-        api_url = "https://api.rindegastos.com/v1/getUser"
-        headers = {"Authorization": f"Bearer {token}"}
-        params = {'Email': self.work_email}
-
-        _logger.info(f"Enviando solicitud a {api_url} para email: {self.work_email}")
-        try:
-            response = requests.get(api_url, headers=headers, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-
-            if data and 'Id' in data and data['Id'] and str(data['Id']) != '0':
-                self.rindegastos_userid = str(data['Id'])
-                _logger.info(f"User ID importado y actualizado: {self.rindegastos_userid} para el empleado {self.name}")
+        if len(self) == 1:
+            if self.rindegastos_userid:
                 message = f'User ID de Rindegastos actualizado: {self.rindegastos_userid}'
             else:
-                self.rindegastos_userid = ''
-                _logger.warning(f"No se encontró un usuario válido en Rindegastos para el email {self.work_email}. Campo dejado en blanco.")
                 message = f'No se encontró un usuario válido para el email {self.work_email}. Campo dejado en blanco.'
-
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'Resultado de Importación',
-                    'message': message,
-                    'sticky': False,
-                }
+        else:
+            message = (
+                f"{stats['found']} User ID actualizados, {stats['not_found']} emails sin usuario en Rindegastos, "
+                f"{stats['cached']} resueltos desde caché, {stats['without_email']} empleados sin email, "
+                f"{stats['without_token']} de compañías sin token, {len(stats['errors'])} errores."
+            )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Resultado de Importación',
+                'message': message,
+                'sticky': False,
             }
-        except requests.exceptions.RequestException as e:
+        }
+
+    @api.model
+    def cron_import_rindegastos_userid(self):
+        """Resuelve el User ID de los empleados con email cuyo User ID falta o está vencido."""
+        params = self.env['ir.config_parameter'].sudo()
+        now = fields.Datetime.now()
+        ttl = timedelta(days=int(params.get_param('rindegastos.userid_cache_ttl_days', 30)))
+        negative_ttl = timedelta(days=int(params.get_param('rindegastos.userid_negative_ttl_days', 7)))
+        batch_size = int(params.get_param('rindegastos.userid_batch_size', 1000))
+        employees = self.search([
+            ('work_email', '!=', False),
+            ('company_id.rindegastos_tokenid', '!=', False),
+            '|', '|',
+            ('rindegastos_userid_checked', '=', False),
+            '&', ('rindegastos_userid', '!=', False), ('rindegastos_userid_checked', '<', now - ttl),
+            '&', ('rindegastos_userid', '=', False), ('rindegastos_userid_checked', '<', now - negative_ttl),
+        ], order='rindegastos_userid_checked asc nulls first, id', limit=batch_size)
+        stats = employees._resolve_rindegastos_userids()
+        _logger.info(f"Resolución de User ID de Rindegastos: {stats['found']} encontrados, {stats['not_found']} sin usuario, "
+                     f"{stats['cached']} desde caché, {len(stats['errors'])} errores.")
+
+    def _resolve_rindegastos_userids(self, force=False):
+        """Resuelve y escribe en lote el User ID de los empleados; omite las compañías sin token."""
+        stats = {'found': 0, 'not_found': 0, 'cached': 0, 'without_email': 0, 'without_token': 0, 'errors': []}
+        cache_model = self.env['rindegastos.user.cache']
+        resolved = {}  # employee id -> user id ('' si no existe)
+        for company, employees in self.grouped(lambda e: e.company_id or self.env.company).items():
+            with_email = employees.filtered('work_email')
+            stats['without_email'] += len(employees - with_email)
+            if not with_email:
+                continue
+            if not company.rindegastos_tokenid:
+                _logger.warning(f"La compañía {company.name} no tiene token de Rindegastos; se omiten {len(with_email)} empleados.")
+                stats['without_token'] += len(with_email)
+                continue
+
+            emails = {cache_model._normalize_email(e.work_email) for e in with_email}
+            known = {} if force else cache_model._get_fresh_entries(company, emails)
+            stats['cached'] += len(known)
+            pending = sorted(emails - set(known))
+
+            client = company._get_rindegastos_client()
+            _logger.info(f"Consultando getUser para {len(pending)} emails de la compañía {company.name}")
+            results = run_concurrently(lambda email: self._lookup_rindegastos_userid(client, email), pending, client.max_workers)
+            fetched = {}
+            for email, result in zip(pending, results):
+                if isinstance(result, RindegastosApiError):
+                    stats['errors'].append(f"{email}: {result}")
+                else:
+                    fetched[email] = result
+            cache_model._store_entries(company, fetched)
+            known.update(fetched)
+
+            for employee in with_email:
+                user_id = known.get(cache_model._normalize_email(employee.work_email))
+                if user_id is not None:
+                    resolved[employee.id] = user_id
+                    stats['found' if user_id else 'not_found'] += 1
+
+        self._write_rindegastos_userids(resolved)
+        return stats
+
+    @api.model
+    def _lookup_rindegastos_userid(self, client, email):
+        try:
+            data = client.get('getUser', params={'Email': email})
+        except RindegastosApiError as e:
             _logger.error(f"Error al conectar con la API de Rindegastos: {str(e)}")
-            raise UserError(f"Error al conectar con la API de Rindegastos: {str(e)}")
\ No newline at end of file
+            return e
+        if data and 'Id' in data and data['Id'] and str(data['Id']) != '0':
+            return str(data['Id'])
+        _logger.warning(f"No se encontró un usuario válido en Rindegastos para el email {email}.")
+        return ''
+
+    def _write_rindegastos_userids(self, resolved):
+        """Escribe los User ID resueltos con un ``write`` por valor, respetando permisos y reglas de registro."""
+        if not resolved:
+            return
+        now = fields.Datetime.now()
+        employee_ids_by_userid = {}
+        for employee_id, user_id in resolved.items():
+            employee_ids_by_userid.setdefault(user_id or False, []).append(employee_id)
+        for user_id, employee_ids in employee_ids_by_userid.items():
+            self.browse(employee_ids).write({'rindegastos_userid': user_id, 'rindegastos_userid_checked': now})
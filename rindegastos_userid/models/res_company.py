@@ -1,6 +1,24 @@
 from odoo import models, fields
 
+from ..tools.common import API_URL
+
+
 class ResCompany(models.Model):
     _inherit = 'res.company'
 
-    rindegastos_tokenid = fields.Char(string='Rindegastos Token ID', help='Token de acceso para la API de Rindegastos')
\ No newline at end of file
+    rindegastos_tokenid = fields.Char(string='Rindegastos Token ID', help='Token de acceso para la API de Rindegastos')
+
+    def _get_rindegastos_client(self):
+        """Cliente HTTP compartido para el token de la compañía, configurado desde los parámetros del sistema."""
+        self.ensure_one()
+        # Capa de servicio: se importa aquí para no cargar requests al levantar el registro
+        from ..tools.rindegastos_api import get_client
+        params = self.env['ir.config_parameter'].sudo()
+        return get_client(
+            self.rindegastos_tokenid,
+            base_url=params.get_param('rindegastos.api_url', API_URL),
+            requests_per_second=float(params.get_param('rindegastos.requests_per_second', 5.0)),
+            max_retries=int(params.get_param('rindegastos.max_retries', 5)),
+            max_workers=int(params.get_param('rindegastos.fetch_workers', 4)),
+            window_records=int(params.get_param('rindegastos.sync_window_records', 2000)),
+        )
@@ -0,0 +1,63 @@
+from odoo import models, fields, api
+from psycopg2.extras import execute_values
+from datetime import timedelta
+
+
+class RindegastosUserCache(models.Model):
+    _name = 'rindegastos.user.cache'
+    _description = 'Caché de User ID de Rindegastos por email'
+    _rec_name = 'email'
+
+    email = fields.Char(string='Email', required=True, index=True)
+    company_id = fields.Many2one('res.company', string='Compañía', required=True, ondelete='cascade')
+    rindegastos_userid = fields.Char(string='Rindegastos User ID', help='Vacío si el email no existe en Rindegastos (caché negativa)')
+    checked_at = fields.Datetime(string='Consultado el', required=True)
+
+    _sql_constraints = [
+        ('company_email_uniq', 'unique(company_id, email)', 'El email ya está en la caché de Rindegastos para esta compañía.'),
+    ]
+
+    @api.model
+    def _normalize_email(self, email):
+        return (email or '').strip().lower()
+
+    @api.model
+    def _get_fresh_entries(self, company, emails):
+        """Devuelve {email: user_id} con las entradas vigentes; '' indica un email inexistente."""
+        if not emails:
+            return {}
+        params = self.env['ir.config_parameter'].sudo()
+        now = fields.Datetime.now()
+        ttl = timedelta(days=int(params.get_param('rindegastos.userid_cache_ttl_days', 30)))
+        negative_ttl = timedelta(days=int(params.get_param('rindegastos.userid_negative_ttl_days', 7)))
+        entries = self.sudo().search_read([
+            ('company_id', '=', company.id),
+            ('email', 'in', list(emails)),
+        ], ['email', 'rindegastos_userid', 'checked_at'])
+        return {
+            entry['email']: entry['rindegastos_userid'] or ''
+            for entry in entries
+            if entry['checked_at'] >= now - (ttl if entry['rindegastos_userid'] else negative_ttl)
+        }
+
+    @api.model
+    def _store_entries(self, company, results):
+        """Inserta o actualiza en una sola sentencia los resultados {email: user_id} consultados."""
+        if not results:
+            return
+        self.flush_model()
+        now = fields.Datetime.now()
+        execute_values(self.env.cr._obj, """
+            INSERT INTO rindegastos_user_cache (email, company_id, rindegastos_userid, checked_at,
+                                                create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (company_id, email) DO UPDATE
+               SET rindegastos_userid = EXCLUDED.rindegastos_userid,
+                   checked_at = EXCLUDED.checked_at,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, [
+            (email, company.id, user_id or None, now, self.env.uid, now, self.env.uid, now)
+            for email, user_id in results.items()
+        ])
+        self.invalidate_model()
@@ -0,0 +1,41 @@
+"""Constantes, excepciones y utilidades de concurrencia de la integración con Rindegastos.
+
+Este módulo no depende de ``requests`` ni del cliente HTTP: los modelos lo importan al
+cargar el registro, mientras que ``rindegastos_api`` (la capa de servicio) solo se importa
+al ejecutar una sincronización, una búsqueda de UserId o un webhook.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+API_URL = 'https://api.rindegastos.com/v1'
+MAX_RESULTS_PER_PAGE = 500  # Máximo de ResultsPerPage que acepta la API
+WINDOW_RECORDS = 2000  # Registros por ventana de fechas antes de partirla
+FILE_HOSTS = ('rindegastos.com',)  # Dominios desde los que se descargan archivos (y sus subdominios)
+
+
+class RindegastosApiError(Exception):
+    """Error definitivo al consultar la API, tras agotar los reintentos."""
+
+
+class CircuitOpenError(RindegastosApiError):
+    """El circuito del token está abierto y la solicitud no se envía."""
+
+
+def run_concurrently(func, items, max_workers):
+    """Aplica ``func`` a cada elemento con un pool acotado y devuelve los resultados en orden.
+
+    Las funciones ejecutadas en el pool solo deben hacer HTTP y decodificar JSON: el cursor
+    de Odoo no es thread-safe, por lo que la escritura queda en el hilo que llama. Cada tarea
+    corre en una copia del contexto del llamador para conservar el colector de métricas.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    contexts = [contextvars.copy_context() for _item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix='rindegastos') as pool:
+        return list(pool.map(lambda context, item: context.run(func, item), contexts, items))
+
+
+def total_workers(clients):
+    """Hilos necesarios para atender varios tokens en paralelo: la suma de sus límites por token."""
+    return sum(client.max_workers for client in set(clients))
@@ -0,0 +1,333 @@
+"""Cliente HTTP compartido para todas las llamadas a la API de Rindegastos.
+
+Mantiene un pool de conexiones keep-alive por token, reintenta las respuestas 429/5xx con
+backoff exponencial y jitter (respetando Retry-After), limita las solicitudes por segundo
+de cada token y abre un circuito cuando la API falla de forma consecutiva.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import date, timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .common import API_URL, FILE_HOSTS, MAX_RESULTS_PER_PAGE, WINDOW_RECORDS, CircuitOpenError, RindegastosApiError, run_concurrently
+from .sync_stats import current_stats
+
+_logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Errores de red que se reintentan; el resto de RequestException se informa como RindegastosApiError
+RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class _RateLimiter:
+    """Token bucket: permite como máximo ``rate`` solicitudes por segundo."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + 1.0 / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _CircuitBreaker:
+    """Circuito closed -> open -> half_open; solo cuentan las solicitudes que agotaron sus reintentos (sin 429)."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probe = None  # Hilo que ejecuta la solicitud de prueba en half_open
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_request(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and self._probe in (None, threading.get_ident()):
+                self._probe = threading.get_ident()
+                return
+        raise CircuitOpenError(
+            f"Circuito abierto tras {self.failures} fallos consecutivos de la API de Rindegastos; "
+            f"se reintentará en {self.reset_timeout:.0f} segundos."
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # En half_open un solo fallo vuelve a abrir el circuito
+                self.opened_at = time.monotonic()
+            self._probe = None
+
+    def release(self):
+        """Libera la prueba de half_open si la solicitud del hilo terminó sin éxito ni fallo contable."""
+        with self._lock:
+            if self._probe == threading.get_ident():
+                self._probe = None
+
+
+class RindegastosClient:
+    """Cliente de la API de Rindegastos para un token."""
+
+    def __init__(self, token, base_url=API_URL, requests_per_second=5.0, max_retries=5,
+                 backoff_factor=0.5, max_backoff=30.0, timeout=30, pool_size=10, max_workers=4,
+                 window_records=WINDOW_RECORDS, window_retries=2):
+        self.token = token
+        self.window_records = window_records
+        self.window_retries = window_retries
+        self.max_workers = max_workers
+        # Tope de solicitudes simultáneas del token, aunque varias compañías o pools lo compartan
+        self._slots = threading.BoundedSemaphore(max(max_workers, 1))
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = _RateLimiter(requests_per_second)
+        self.circuit = _CircuitBreaker()
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {token}"})
+        # Diarios y páginas se descargan en pools anidados: hasta max_workers² conexiones simultáneas
+        pool_size = max(pool_size, max_workers * max_workers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def circuit_state(self):
+        return self.circuit.state
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response is not None and response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    return min(max(delay, 0.0), self.max_backoff)
+                except (TypeError, ValueError):
+                    pass
+        # Backoff exponencial con full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def get(self, endpoint, params=None):
+        """Ejecuta un GET sobre ``endpoint`` (p. ej. 'getExpenses') y devuelve el JSON decodificado."""
+        try:
+            return self._get(endpoint, params)
+        finally:
+            self.circuit.release()
+
+    def _get(self, endpoint, params):
+        url = f"{self.base_url}/{endpoint}"
+        attempt = 0
+        while True:
+            self.circuit.before_request()
+            self.rate_limiter.acquire()
+            response = None
+            start = time.perf_counter()
+            try:
+                with self._slots:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except RETRY_ERRORS as e:
+                error = e
+            except requests.exceptions.RequestException as e:
+                raise RindegastosApiError(str(e)) from e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                error = requests.exceptions.HTTPError(f"{response.status_code} para {url}", response=response)
+
+            stats = current_stats()
+            if attempt >= self.max_retries:
+                # La solicitud cuenta una sola vez para el circuito, y solo si no fue un 429
+                if response is None or response.status_code != 429:
+                    self.circuit.record_failure()
+                raise RindegastosApiError(f"{error} (tras {attempt + 1} intentos)") from error
+            delay = self._retry_delay(attempt, response)
+            _logger.warning(f"Error transitorio en {endpoint} ({error}); reintento {attempt + 1}/{self.max_retries} en {delay:.2f}s")
+            if stats is not None:
+                stats.record_retry()
+            time.sleep(delay)
+            attempt += 1
+
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise RindegastosApiError(str(e)) from e
+        self.circuit.record_success()
+        stats = current_stats()
+        if stats is not None:
+            stats.record_request(time.perf_counter() - start, len(response.content))
+        return data
+
+    def get_all_pages(self, endpoint, params):
+        """Descarga todas las páginas de ``endpoint``; con Since y Until, por ventanas de fechas."""
+        if not (params.get('Since') and params.get('Until')):
+            _total_pages, payloads = self.get_page_range(endpoint, params, 1)
+            return payloads
+        windows = run_concurrently(
+            lambda window: self._get_window(endpoint, window[0]),
+            self.plan_windows(endpoint, params),
+            self.max_workers,
+        )
+        return [payload for payloads in windows for payload in payloads]
+
+    def _get_window(self, endpoint, params):
+        """Descarga todas las páginas de una ventana, reintentándola completa si falla."""
+        attempt = 0
+        while True:
+            try:
+                _total_pages, payloads = self.get_page_range(endpoint, params, 1)
+                return payloads
+            except CircuitOpenError:
+                raise
+            except RindegastosApiError as e:
+                if attempt >= self.window_retries:
+                    raise
+                attempt += 1
+                _logger.warning(f"Error en la ventana {params.get('Since')}..{params.get('Until')} de {endpoint} ({e}); "
+                                f"reintento {attempt}/{self.window_retries}")
+
+    def count_records(self, endpoint, params):
+        """Total de registros de la consulta, leído de ``Records`` con una página de un registro."""
+        records = self.get(endpoint, params=dict(params, ResultsPerPage=1, Page=1)).get('Records') or {}
+        # Con una página de un registro Pages coincide con Results, salvo si no hay registros (Pages es 1)
+        if 'Results' in records:
+            return int(records['Results'] or 0)
+        return int(records.get('Pages') or 0)
+
+    def plan_windows(self, endpoint, params):
+        """Parte el rango Since/Until en ventanas de a lo sumo ``window_records`` registros: [(params, páginas)]."""
+        windows, level = [], [(date.fromisoformat(params['Since']), date.fromisoformat(params['Until']))]
+        while level:
+            counts = run_concurrently(
+                lambda window: self.count_records(endpoint, dict(params, Since=window[0].isoformat(), Until=window[1].isoformat())),
+                level,
+                self.max_workers,
+            )
+            next_level = []
+            for (since, until), records in zip(level, counts):
+                if records > self.window_records and since < until:
+                    middle = since + (until - since) // 2
+                    next_level += [(since, middle), (middle + timedelta(days=1), until)]
+                elif records:
+                    windows.append((since, until, records))
+            level = next_level
+        plan = []
+        for since, until, records in sorted(windows):
+            per_page = min(MAX_RESULTS_PER_PAGE, records)
+            plan.append((
+                dict(params, Since=since.isoformat(), Until=until.isoformat(), ResultsPerPage=per_page),
+                -(-records // per_page),
+            ))
+        return plan
+
+    def get_page_range(self, endpoint, params, start, count=None, total_pages=None):
+        """Descarga ``count`` páginas desde ``start`` (todas si es None) y devuelve (total_pages, payloads)."""
+        payloads = []
+        if not total_pages:
+            first = self.get(endpoint, params=dict(params, Page=start))
+            total_pages = int((first.get('Records') or {}).get('Pages') or 1)
+            payloads.append(first)
+        end = total_pages if count is None else min(total_pages, start + count - 1)
+        pages = range(start + len(payloads), end + 1)
+        payloads += self.get_pages(endpoint, params, pages)
+        return total_pages, payloads
+
+    def get_pages(self, endpoint, params, pages):
+        """Descarga en paralelo las páginas indicadas y devuelve los payloads en orden."""
+        return run_concurrently(lambda page: self.get(endpoint, params=dict(params, Page=page)), pages, self.max_workers)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_file_session = requests.Session()
+_file_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+
+def check_file_url(url, allowed_hosts=FILE_HOSTS):
+    """Rechaza las URLs de archivo que no son https a un host permitido, en el puerto estándar."""
+    try:
+        parts = urlsplit(url or '')
+        port = parts.port
+    except ValueError as e:
+        raise RindegastosApiError(f"URL de archivo inválida: {url}") from e
+    host = (parts.hostname or '').lower()
+    if (parts.scheme != 'https' or parts.username or parts.password or port not in (None, 443)
+            or not any(host == allowed or host.endswith(f'.{allowed}') for allowed in allowed_hosts)):
+        raise RindegastosApiError(f"URL de archivo no permitida: {url}")
+
+
+def download_file(url, timeout=30, max_bytes=10 * 1024 * 1024, allowed_hosts=FILE_HOSTS):
+    """Descarga un archivo adjunto de Rindegastos (sin token) y devuelve sus bytes; no sigue redirecciones."""
+    check_file_url(url, allowed_hosts)
+    try:
+        with _file_session.get(url, timeout=timeout, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                raise RindegastosApiError(f"El archivo {url} redirige a {response.headers.get('Location')}")
+            response.raise_for_status()
+            content = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                if len(content) > max_bytes:
+                    raise RindegastosApiError(f"El archivo {url} supera {max_bytes} bytes")
+            return bytes(content)
+    except requests.exceptions.RequestException as e:
+        raise RindegastosApiError(str(e)) from e
+
+
+def get_client(token, **options):
+    """Devuelve el cliente compartido del token, creándolo (o reconfigurándolo) si hace falta."""
+    with _clients_lock:
+        client = _clients.get(token)
+        if client is None:
+            client = _clients[token] = RindegastosClient(token, **options)
+        else:
+            client.base_url = options.get('base_url', client.base_url).rstrip('/')
+            client.rate_limiter.rate = options.get('requests_per_second', client.rate_limiter.rate)
+            client.max_retries = options.get('max_retries', client.max_retries)
+            max_workers = options.get('max_workers', client.max_workers)
+            if max_workers != client.max_workers:
+                client.max_workers = max_workers
+                client._slots = threading.BoundedSemaphore(max(max_workers, 1))
+            client.window_records = options.get('window_records', client.window_records)
+        return client
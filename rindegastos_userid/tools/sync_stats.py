@@ -0,0 +1,117 @@
+"""Métricas de una ejecución de sincronización con Rindegastos.
+
+El colector activo viaja en una ``ContextVar``: ``run_concurrently`` la propaga a los hilos
+del pool, de modo que el cliente HTTP y el código del ORM registran en el mismo objeto sin
+recibirlo como argumento. Sin colector activo todas las funciones son no-op.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_stats = ContextVar('rindegastos_sync_stats', default=None)
+
+PHASES = ('fetch', 'parse', 'dedup', 'create', 'statement')
+
+
+class SyncStats:
+    """Acumulador thread-safe; los registros de un hijo (diario) también suman en el padre."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.latencies = []
+        self.retries = 0
+        self.bytes = 0
+        self.counters = Counter()
+        self.phase_seconds = Counter()
+        self.phase_queries = Counter()
+        self.children = {}
+        self._lock = threading.Lock()
+
+    def for_journal(self, journal_id):
+        with self._lock:
+            if journal_id not in self.children:
+                self.children[journal_id] = SyncStats(parent=self)
+            return self.children[journal_id]
+
+    def record_request(self, latency, size):
+        with self._lock:
+            self.latencies.append(latency)
+            self.bytes += size
+        if self.parent:
+            self.parent.record_request(latency, size)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+        if self.parent:
+            self.parent.record_retry()
+
+    def add(self, key, count=1):
+        with self._lock:
+            self.counters[key] += count
+        if self.parent:
+            self.parent.add(key, count)
+
+    def add_phase(self, phase, seconds, queries):
+        with self._lock:
+            self.phase_seconds[phase] += seconds
+            self.phase_queries[phase] += queries
+        if self.parent:
+            self.parent.add_phase(phase, seconds, queries)
+
+    def percentile(self, percent):
+        """Percentil de latencia en segundos (método nearest-rank)."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        rank = max(int(round(percent / 100.0 * len(latencies) + 0.5)) - 1, 0)
+        return latencies[min(rank, len(latencies) - 1)]
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+@contextmanager
+def collect_stats(stats):
+    """Activa ``stats`` como colector del contexto actual."""
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def journal_scope(journal_id):
+    """Dirige los registros siguientes a la línea del diario dentro del colector activo."""
+    stats = _current_stats.get()
+    if stats is None:
+        yield None
+        return
+    with collect_stats(stats.for_journal(journal_id)) as child:
+        yield child
+
+
+@contextmanager
+def sync_phase(phase, cr=None):
+    """Mide el tiempo y, si se entrega el cursor, las consultas SQL de una fase."""
+    stats = _current_stats.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    queries = cr.sql_log_count if cr is not None else 0
+    try:
+        yield
+    finally:
+        stats.add_phase(phase, time.perf_counter() - start, (cr.sql_log_count - queries) if cr is not None else 0)
+
+
+def count_stat(key, count=1):
+    stats = _current_stats.get()
+    if stats is not None and count:
+        stats.add(key, count)